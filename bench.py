@@ -0,0 +1,437 @@
+# 파일명: bench.py
+"""
+재현 가능한 벤치마크 (cut_questions / extract_questions)
+- PyMuPDF로 가상 문제지 PDF 생성: 쪽 수 · 단 수 · 단당 문항 수 · ①~⑤ 보기 · 그림 · 스캔본
+- 생성할 때 문항 번호·영역(정답)을 함께 기록
+- 케이스 × 파이프라인마다 새 프로세스에서 실행 → 처리량 · 최대 RSS · 출력 용량
+- 검출한 문항 번호와 crop 영역을 정답과 대조
+- --save 로 결과 저장, --baseline 으로 이전 결과와 비교 (성능 변경 채택/기각용)
+
+    python bench.py                      # 기본 스위트
+    python bench.py --cases 2col -j 4 --scale 5 --repeat 3
+    python bench.py --save new.json --baseline old.json --max-regress 5
+    python bench.py --generate samples   # PDF와 정답 JSON만 생성
+"""
+import io
+import os
+import sys
+import json
+import time
+import random
+import argparse
+import tempfile
+import statistics
+import multiprocessing
+from dataclasses import asdict, dataclass
+
+import fitz      # pip install pymupdf
+from PIL import Image, ImageDraw  # pip install pillow
+try:
+    import resource   # 유닉스 전용 — 없으면 RSS는 기록하지 않음
+except ImportError:
+    resource = None
+
+from layout_cache import LayoutCache, file_hash
+from manifest import Manifest
+from perf import Stats, build_report
+
+# ──────────────────────────────────────
+# 가상 문제지 생성
+
+PAGE_W, PAGE_H = 595, 842   # A4 (pt)
+MARGIN_X = 40
+MARGIN_Y = 60
+GUTTER   = 24
+FONT     = "korea"
+FS       = 10               # 글자 크기(pt)
+LINE     = FS * 1.6         # 줄 간격(pt)
+SET_SIZE = 45               # 과목(세트)마다 1번부터 다시 — 두 자리 번호 유지
+SCAN_DPI = 150
+
+STEMS = [
+    "다음 중 옳은 것은?",
+    "밑줄 친 부분에 대한 설명으로 옳지 않은 것은?",
+    "다음 글을 읽고 물음에 답하시오.",
+    "(가)에 들어갈 내용으로 가장 적절한 것은?",
+    "자료에 대한 해석으로 옳은 것만을 고른 것은?",
+    "다음 사건이 일어난 시기를 연표에서 고르면?",
+]
+OPTIONS = ["① 가", "② 나", "③ 다", "④ 라", "⑤ 마"]
+
+@dataclass(frozen=True)
+class Spec:
+    name: str
+    pages: int
+    columns: int = 2
+    per_col: int = 4           # 단당 문항 수 (밀도)
+    options: bool = True       # ①~⑤ 보기 줄
+    images: float = 0.0        # 그림이 들어가는 문항 비율
+    scanned: bool = False      # 텍스트 레이어 없는 스캔본
+    seed: int = 0
+
+SUITE = [
+    Spec("1col",       pages=8,  columns=1, per_col=5),
+    Spec("2col",       pages=12, columns=2, per_col=4, images=0.25),
+    Spec("3col-dense", pages=6,  columns=3, per_col=6),
+    Spec("2col-noopt", pages=6,  columns=2, per_col=5, options=False),
+    Spec("2col-scan",  pages=6,  columns=2, per_col=4, images=0.25, scanned=True),
+]
+
+def _figure(rng: random.Random, w: int, h: int) -> bytes:
+    """문항 그림 대용: 도형 몇 개를 그린 PNG"""
+    img = Image.new("RGB", (w, h), "white")
+    draw = ImageDraw.Draw(img)
+    for _ in range(6):
+        x0, y0 = rng.randrange(w - 10), rng.randrange(h - 10)
+        x1, y1 = rng.randrange(x0 + 5, w), rng.randrange(y0 + 5, h)
+        color = tuple(rng.randrange(256) for _ in range(3))
+        (draw.ellipse if rng.random() < 0.5 else draw.rectangle)((x0, y0, x1, y1), fill=color)
+    buf = io.BytesIO()
+    img.save(buf, "PNG")
+    return buf.getvalue()
+
+def _fit(text: str, width: float) -> str:
+    while fitz.get_text_length(text, fontname=FONT, fontsize=FS) > width:
+        text = text[:-1]
+    return text
+
+def _scan(doc: fitz.Document) -> fitz.Document:
+    """각 쪽을 흑백 이미지로 바꾼 스캔본 (텍스트 레이어 없음)"""
+    out = fitz.open()
+    for page in doc:
+        pix = page.get_pixmap(dpi=SCAN_DPI, colorspace=fitz.csGRAY)
+        out.new_page(width=page.rect.width, height=page.rect.height).insert_image(
+            page.rect, pixmap=pix)
+    return out
+
+def make_exam(path: str, spec: Spec) -> dict:
+    """spec대로 문제지 PDF를 만들고 정답을 돌려준다.
+    → {"spec": ..., "questions": [{"page", "num", "col", "box", "head"}, ...]}
+      page는 1부터, box는 문항 전체·head는 번호 줄 영역(pt)
+    """
+    rng = random.Random(spec.seed)
+    col_w = (PAGE_W - 2 * MARGIN_X - GUTTER * (spec.columns - 1)) / spec.columns
+    slot_h = (PAGE_H - 2 * MARGIN_Y) / spec.per_col
+    opt_lines = ["  ".join(OPTIONS)] if fitz.get_text_length(
+        "  ".join(OPTIONS), fontname=FONT, fontsize=FS) <= col_w else \
+        ["  ".join(OPTIONS[:3]), "  ".join(OPTIONS[3:])]
+    text_h = LINE * (1 + (len(opt_lines) if spec.options else 0))
+    fig_h = min(80, slot_h - text_h - 16)
+    if fig_h < 20 and spec.images:
+        raise ValueError(f"{spec.name}: 문항 밀도가 너무 높아 그림을 넣을 수 없음")
+    if text_h > slot_h - 8:
+        raise ValueError(f"{spec.name}: 문항 밀도가 너무 높음")
+    figures = [_figure(rng, 280, int(fig_h * 2)) for _ in range(4)] if spec.images else []
+
+    doc = fitz.open()
+    questions, n = [], 0
+    for pno in range(spec.pages):
+        page = doc.new_page(width=PAGE_W, height=PAGE_H)
+        for col in range(spec.columns):
+            x = MARGIN_X + col * (col_w + GUTTER)
+            for slot in range(spec.per_col):
+                num = n % SET_SIZE + 1
+                n += 1
+                y = MARGIN_Y + slot * slot_h + FS   # 첫 줄 기준선
+                stem = _fit(f"{num}. {rng.choice(STEMS)}", col_w)
+                page.insert_text((x, y), stem, fontname=FONT, fontsize=FS)
+                right = x + fitz.get_text_length(stem, fontname=FONT, fontsize=FS)
+                head = [x, y - FS, right, y + FS * 0.3]
+                bottom = y + FS * 0.3
+                if spec.images and rng.random() < spec.images:
+                    fw = min(col_w, fig_h * 2)
+                    r = fitz.Rect(x, bottom + 6, x + fw, bottom + 6 + fig_h)
+                    page.insert_image(r, stream=rng.choice(figures))
+                    right, bottom = max(right, r.x1), r.y1
+                    y = bottom
+                if spec.options:
+                    for line in opt_lines:
+                        y += LINE
+                        page.insert_text((x, y), line, fontname=FONT, fontsize=FS)
+                        right = max(right, x + fitz.get_text_length(line, fontname=FONT,
+                                                                    fontsize=FS))
+                    bottom = y + FS * 0.3
+                questions.append({"page": pno + 1, "num": num, "col": col,
+                                  "box": [round(v, 2) for v in (x, head[1], right, bottom)],
+                                  "head": [round(v, 2) for v in head]})
+    if spec.scanned:
+        scanned = _scan(doc)
+        doc.close()
+        doc = scanned
+    doc.save(path, garbage=3, deflate=True)
+    doc.close()
+    return {"spec": asdict(spec), "questions": questions}
+
+# ──────────────────────────────────────
+# 정답 대조
+
+TOL = 2.0   # 영역 비교 허용 오차(pt)
+
+def _contains(outer, inner) -> bool:
+    return (outer[0] <= inner[0] + TOL and outer[1] <= inner[1] + TOL and
+            outer[2] >= inner[2] - TOL and outer[3] >= inner[3] - TOL)
+
+def _overlaps(a, b) -> bool:
+    return (min(a[2], b[2]) - max(a[0], b[0]) > TOL and
+            min(a[3], b[3]) - max(a[1], b[1]) > TOL)
+
+def check(truth: dict, found: list, next_head_ok: bool = False) -> dict:
+    """found: [(page, num, box_pt), ...]
+    문항 번호가 정답과 같고, 각 crop이 그 문항 전체를 담으면서 다른 문항의 번호 줄은
+    침범하지 않아야 통과. next_head_ok면 같은 단 바로 아래 문항의 번호 줄까지는
+    허용한다 (extract_questions는 다음 번호 줄 아래까지 자른다).
+    """
+    expected = {(q["page"], q["num"]): q for q in truth["questions"]}
+    heads, below = {}, {}
+    for q in truth["questions"]:
+        heads.setdefault(q["page"], []).append(q)
+    for qs in heads.values():
+        for q in qs:
+            nxt = [o for o in qs if o["col"] == q["col"] and o["head"][1] > q["head"][1]]
+            below[id(q)] = min(nxt, key=lambda o: o["head"][1]) if nxt else None
+    got, dupes, bad = {}, 0, []
+    for page, num, box in found:
+        if (page, num) in got:
+            dupes += 1
+        got[(page, num)] = box
+    for key, box in got.items():
+        q = expected.get(key)
+        if q is None:
+            continue
+        nxt = below[id(q)] if next_head_ok else None
+        if not _contains(box, q["box"]) or any(
+                o is not q and o is not nxt and _overlaps(box, o["head"])
+                for o in heads[q["page"]]):
+            bad.append(f"p{key[0]}#{key[1]}")
+    missing = sorted(set(expected) - set(got))
+    extra = sorted(set(got) - set(expected))
+    return {"expected": len(expected), "found": len(found), "dupes": dupes,
+            "missing": len(missing), "extra": len(extra), "bad_boxes": len(bad),
+            "examples": [f"p{p}#{n} 누락" for p, n in missing[:3]] +
+                        [f"p{p}#{n} 잘못 검출" for p, n in extra[:3]] + bad[:3],
+            "ok": not (missing or extra or bad or dupes)}
+
+# ──────────────────────────────────────
+# 파이프라인 실행 (케이스마다 새 프로세스)
+
+def _peak_rss_mb(who) -> float:
+    if resource is None:
+        return None
+    kb = resource.getrusage(who).ru_maxrss
+    if sys.platform == "darwin":   # macOS는 바이트 단위
+        kb /= 1024
+    return round(kb / 1024, 1)
+
+class _Events:
+    """log 큐 / sg.Window 대용 — 오류만 모아 둔다"""
+    def __init__(self):
+        self.errors = []
+
+    def put(self, item):
+        pass
+
+    def write_event_value(self, key, value):
+        if key == "-ERROR-":
+            self.errors.append(value)
+
+def _run_cut(pdf: str, out: str, work: str, workers: int, fmt: str, columns: int) -> tuple:
+    from cut_questions import Options, run_batch
+    # 레이아웃 캐시 없이, 빈 출력 폴더 → 매번 검출·렌더 전부 수행. 매니페스트에서 영역을 읽음
+    report = run_batch([(pdf, "B", out)], Options(fmt=fmt), _Events(), workers=workers)
+    manifest = Manifest(out)
+    manifest.close()
+    found = [(r["page"], int(r["num"]), r["clip"]) for r in manifest.records.values()]
+    return report, found
+
+def _run_extract(pdf: str, out: str, work: str, workers: int, fmt: str, columns: int) -> tuple:
+    import extract_questions as eq
+    events, stats = _Events(), Stats()
+    # 빈 캐시를 따로 두고, 실행이 끝나면 거기 기록된 번호 위치로 crop 영역을 다시 계산
+    with LayoutCache(os.path.join(work, "layout.sqlite")) as cache:
+        t0 = time.perf_counter()
+        pool = eq.OcrPool(workers) if workers > 1 else None
+        try:
+            eq.process_pdf(pdf, "B", out, fmt, events, columns=columns, pool=pool,
+                           cache=cache, stats=stats)
+        finally:
+            if pool is not None:
+                pool.close()
+        wall = time.perf_counter() - t0
+        if events.errors:
+            raise RuntimeError(events.errors[0])
+        pages = cache.get_doc(file_hash(pdf), f"{eq.DETECTOR}/{eq.DPI}dpi/{columns}col")
+    scale = 72 / eq.DPI
+    w, h = round(PAGE_W / scale), round(PAGE_H / scale)
+    found = [(pno + 1, int(mark["num"]), [v * scale for v in box])
+             for pno, (_, marks, cols) in sorted(pages.items())
+             for mark, box in eq.crop_boxes(marks, w, h, cols)]
+    return build_report(stats, wall, workers=workers), found
+
+PIPELINES = {"cut": _run_cut, "extract": _run_extract}
+
+def _child(conn, pipeline: str, pdf: str, work: str, workers: int, fmt: str, columns: int):
+    try:
+        out = os.path.join(work, "out")
+        os.makedirs(out)
+        report, found = PIPELINES[pipeline](pdf, out, work, workers, fmt, columns)
+        conn.send({"report": report, "found": found,
+                   "rss_mb": _peak_rss_mb(resource.RUSAGE_SELF) if resource else None,
+                   "worker_rss_mb": _peak_rss_mb(resource.RUSAGE_CHILDREN) if resource else None})
+    except Exception as e:
+        conn.send({"error": f"{type(e).__name__}: {e}"})
+    finally:
+        conn.close()
+
+def run_once(pipeline: str, pdf: str, truth: dict, workers: int, fmt: str) -> dict:
+    ctx = multiprocessing.get_context("spawn")   # 매번 깨끗한 프로세스 → RSS·캐시 영향 없음
+    recv, send = ctx.Pipe(duplex=False)
+    with tempfile.TemporaryDirectory(prefix="bench-") as work:
+        p = ctx.Process(target=_child, args=(send, pipeline, pdf, work, workers, fmt,
+                                             truth["spec"]["columns"]))
+        p.start()
+        send.close()
+        try:
+            res = recv.recv()
+        except EOFError:
+            res = {"error": f"프로세스 비정상 종료 (exit {p.exitcode})"}
+        p.join()
+    if "error" in res:
+        return res
+    rep = res["report"]
+    return {"wall_seconds": rep["wall_seconds"],
+            "pages_per_sec": rep["pages_per_sec"], "crops_per_sec": rep["crops_per_sec"],
+            "rss_mb": res["rss_mb"], "worker_rss_mb": res["worker_rss_mb"],
+            "output_bytes": rep["counts"].get("bytes", 0),
+            "seconds": rep["seconds"], "counts": rep["counts"],
+            "check": check(truth, res["found"], next_head_ok=pipeline == "extract")}
+
+def run_case(spec: Spec, pipeline: str, pdf: str, truth: dict, workers: int, fmt: str,
+             repeat: int) -> dict:
+    if pipeline == "cut" and spec.scanned:
+        return {"skipped": "cut_questions는 텍스트 레이어가 필요함"}
+    runs = [run_once(pipeline, pdf, truth, workers, fmt) for _ in range(repeat)]
+    for r in runs:
+        if "error" in r:
+            return r
+    # 시간은 중앙값 실행, RSS는 최댓값
+    runs.sort(key=lambda r: r["wall_seconds"])
+    best = dict(runs[len(runs) // 2])
+    best["wall_all"] = [r["wall_seconds"] for r in runs]
+    if repeat > 1:
+        best["wall_stdev"] = round(statistics.stdev(best["wall_all"]), 3)
+    return best
+
+# ──────────────────────────────────────
+# 결과 출력·비교
+
+def _fmt(v, nd=1) -> str:
+    return "-" if v is None else f"{v:.{nd}f}"
+
+def print_header() -> None:
+    print(f"{'case':<12} {'pipeline':<8} {'pages/s':>8} {'crops/s':>8} {'RSS MB':>7} "
+          f"{'pool MB':>8} {'out MB':>7}  정답")
+
+def print_row(row: dict) -> None:
+    r = row["result"]
+    head = f"{row['case']:<12} {row['pipeline']:<8} "
+    if "skipped" in r or "error" in r:
+        print(head + ("건너뜀: " + r["skipped"] if "skipped" in r else "오류: " + r["error"]))
+        return
+    c = r["check"]
+    verdict = "OK" if c["ok"] else (f"FAIL 누락 {c['missing']} · 잘못 {c['extra']} · "
+                                    f"영역 {c['bad_boxes']} · 중복 {c['dupes']} "
+                                    f"{' '.join(c['examples'])}")
+    print(head + f"{r['pages_per_sec']:>8.2f} {r['crops_per_sec']:>8.2f} "
+          f"{_fmt(r['rss_mb']):>7} {_fmt(r['worker_rss_mb']):>8} "
+          f"{r['output_bytes'] / 2**20:>7.2f}  {verdict}", flush=True)
+
+def compare(rows: list, baseline: dict, max_regress: float) -> bool:
+    """이전 결과 대비 변화율 출력 → 처리량이 max_regress(%)보다 떨어진 항목이 없으면 True"""
+    old = {(b["case"], b["pipeline"]): b["result"] for b in baseline["rows"]}
+    ok = True
+    print(f"\n{'case':<12} {'pipeline':<8} {'pages/s':>9} {'RSS':>9} {'out':>9}")
+    for row in rows:
+        r, b = row["result"], old.get((row["case"], row["pipeline"]))
+        if b is None or "pages_per_sec" not in r or "pages_per_sec" not in b:
+            continue
+
+        def delta(key):
+            if not b.get(key) or r.get(key) is None:
+                return None
+            return (r[key] - b[key]) / b[key] * 100
+
+        d = delta("pages_per_sec")
+        if d is not None and d < -max_regress:
+            ok = False
+        cells = [_fmt(delta(k)) + "%" if delta(k) is not None else "-"
+                 for k in ("pages_per_sec", "rss_mb", "output_bytes")]
+        print(f"{row['case']:<12} {row['pipeline']:<8} " + " ".join(f"{c:>9}" for c in cells))
+    return ok
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="bench", description="문항 자르기 벤치마크")
+    ap.add_argument("--cases", help="실행할 케이스 (쉼표 구분, 기본: 전부) — "
+                                    + ", ".join(s.name for s in SUITE))
+    ap.add_argument("--pipelines", default="cut,extract", help="cut, extract (쉼표 구분)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="워커 프로세스 수")
+    ap.add_argument("-f", "--fmt", default="png", help="이미지 형식")
+    ap.add_argument("--scale", type=int, default=1, help="케이스 쪽 수 배율")
+    ap.add_argument("--repeat", type=int, default=1, help="반복 횟수 (시간은 중앙값)")
+    ap.add_argument("--generate", metavar="DIR", help="PDF·정답 JSON만 DIR에 만들고 끝냄")
+    ap.add_argument("--save", metavar="FILE", help="결과 JSON 저장")
+    ap.add_argument("--baseline", metavar="FILE", help="비교할 이전 결과 JSON")
+    ap.add_argument("--max-regress", type=float, default=5.0,
+                    help="baseline 대비 pages/s 하락 허용치(%%), 넘으면 종료 코드 1")
+    args = ap.parse_args(argv)
+
+    names = args.cases.split(",") if args.cases else [s.name for s in SUITE]
+    unknown = set(names) - {s.name for s in SUITE}
+    if unknown:
+        ap.error(f"알 수 없는 케이스: {', '.join(sorted(unknown))}")
+    specs = [Spec(**{**asdict(s), "pages": s.pages * args.scale})
+             for s in SUITE if s.name in names]
+    pipelines = args.pipelines.split(",")
+
+    with tempfile.TemporaryDirectory(prefix="bench-pdf-") as tmp:
+        folder = args.generate or tmp
+        os.makedirs(folder, exist_ok=True)
+        exams = []
+        for spec in specs:
+            pdf = os.path.join(folder, f"{spec.name}.pdf")
+            truth = make_exam(pdf, spec)
+            exams.append((spec, pdf, truth))
+            if args.generate:
+                with open(os.path.join(folder, f"{spec.name}.json"), "w", encoding="utf-8") as f:
+                    json.dump(truth, f, ensure_ascii=False, indent=1)
+        if args.generate:
+            print(f"{len(exams)}개 생성: {folder}")
+            return 0
+
+        rows = []
+        print_header()
+        for spec, pdf, truth in exams:
+            for pipeline in pipelines:
+                result = run_case(spec, pipeline, pdf, truth, args.jobs, args.fmt, args.repeat)
+                rows.append({"case": spec.name, "pipeline": pipeline, "result": result})
+                print_row(rows[-1])
+
+    results = {"finished": time.strftime("%Y-%m-%dT%H:%M:%S"), "python": sys.version.split()[0],
+               "fitz": fitz.VersionBind, "cpus": os.cpu_count(), "jobs": args.jobs,
+               "fmt": args.fmt, "scale": args.scale, "repeat": args.repeat,
+               "specs": [asdict(s) for s in specs], "rows": rows}
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=2)
+        print("결과 저장:", args.save)
+
+    # 정답 불일치나 실행 오류가 있으면 실패 (건너뛴 항목은 제외)
+    ok = all("error" not in r["result"] and r["result"].get("check", {"ok": True})["ok"]
+             for r in rows)
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            ok = compare(rows, json.load(f), args.max_regress) and ok
+    return 0 if ok else 1
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
@@ -8,274 +8,897 @@ PDF 한국사·수능 문제지 → 문항 단위 이미지 자동 잘라내기
 - 텍스트 + 보기 + 이미지 모두 빠짐없이 저장
 - 슬림 여백 적용
 """
+import io
 import os
 import re
 import sys
+import math
 import queue
+import argparse
+import time
 import threading
-import tempfile
-import subprocess
+import multiprocessing
 from pathlib import Path
+from bisect import bisect_left, bisect_right
 from collections import defaultdict
+from dataclasses import asdict, dataclass
+from contextlib import nullcontext
+from concurrent.futures import ProcessPoolExecutor
 
 import fitz      # pip install pymupdf
-from PIL import Image, ImageTk  # pip install pillow
+from PIL import Image, ImageChops  # pip install pillow
 
-import tkinter as tk
-from tkinter import filedialog, messagebox, scrolledtext, ttk
+from dedup import BlobStore, fingerprint
+from encoder import FORMATS, MAX_QUALITY, PNG_LEVEL, TARGET_KB, encode_image
+from layout_cache import LayoutCache, file_hash
+from manifest import Manifest, sha256_bytes
+from perf import Stats, build_report, profiled, write_report
+from sinks import KINDS, FolderSink, open_sink
 
 # ──────────────────────────────────────
 RE_NUM    = re.compile(r'^(?:\(|\[)?\s*(\d{1,2})(?:\.|\))')  # 문항 번호
 RE_OPTION = re.compile(r'[①-⑤]')                            # 보기 기호
 
-def compress_jpeg(fp: str, target_kb: int = 500) -> None:
-    """JPEG이 너무 크면 품질 낮춰 재압축"""
-    try:
-        img = Image.open(fp)
-        if img.mode != 'RGB':
-            img = img.convert('RGB')
-        for q in range(95, 9, -5):
-            buf = tempfile.SpooledTemporaryFile()
-            img.save(buf, 'JPEG', quality=q)
-            if buf.tell() <= target_kb * 1024:
-                buf.seek(0)
-                with open(fp, 'wb') as f:
-                    f.write(buf.read())
-                return
-    except Exception:
-        pass
-
-def process_pdf(pdf_path: str, prefix: str, out_folder: str, fmt: str, log: queue.Queue):
-    basename = Path(pdf_path).stem
-    log.put(("log", f"[{basename}] 처리 시작"))
-    try:
-        doc = fitz.open(pdf_path)
-    except Exception as e:
-        log.put(("log", f"[ERR] '{basename}' 열기 실패: {e}"))
-        return
-
-    for pnum, page in enumerate(doc, start=1):
-        try:
-            pd = page.get_text("dict")
-            raw = pd["blocks"]
-        except Exception:
-            log.put(("log", f"[{basename}] p{pnum} 블록 추출 실패"))
+V_MARGIN = 8     # 문항 위아래 여백(pt)
+H_MARGIN = 8     # 컬럼 좌우 여백(pt)
+DPI      = 300
+DETECTOR = "cut_questions/7"   # 검출 로직·여백이 바뀌면 올려서 레이아웃 캐시 무효화
+RENDERER = "render/2"          # 렌더 정책·인코딩이 바뀌면 올려서 매니페스트·중복 저장소 무효화
+
+PREVIEW_DPI = 96            # 미리보기 해상도
+MIN_DPI     = 200           # 목표 용량에 맞추려고 DPI를 낮출 때 하한
+MAX_PIXELS  = 12_000_000    # 문항 한 장 픽셀 상한 (넘으면 DPI를 낮춤)
+COLORS      = ("auto", "rgb", "mono")
+
+@dataclass(frozen=True)
+class Options:
+    """렌더·인코딩 설정 (워커 프로세스로 그대로 전달)"""
+    fmt: str = "png"              # png / jpg / webp
+    gray: bool = False            # 흑백 렌더·저장
+    target_kb: int = TARGET_KB    # jpg/webp 목표 용량
+    png_level: int = PNG_LEVEL    # png 압축 레벨 (1 빠름 ~ 9 작음)
+    color: str = "auto"           # auto: 내용 따라 흑백/컬러, rgb: 항상 컬러, mono: 글자만이면 1비트(png)
+    preview: bool = False         # 저해상도(PREVIEW_DPI) 확인용 출력
+    max_pixels: int = MAX_PIXELS  # 문항 한 장 픽셀 상한
+
+GUTTER_MIN  = 10     # 단 사이 빈 띠(거터) 최소 폭(pt)
+GUTTER_FILL = 0.1    # x별 블록 점유(높이 합)가 양쪽 중 성긴 쪽 최댓값의 이 비율 이하면 빈 띠
+
+def _coverage(blocks: list, w: int) -> list:
+    """x(pt)별 블록 높이 합"""
+    delta = [0.0] * (w + 1)
+    for b in blocks:
+        x0, y0, x1, y1 = b["bbox"]
+        x0, x1 = max(0, int(x0)), min(w - 1, int(x1) + 1)
+        delta[x0] += y1 - y0
+        delta[x1] -= y1 - y0
+    cov, acc = [], 0.0
+    for d in delta[:w]:
+        acc += d
+        cov.append(acc)
+    return cov
+
+def _bands(cov: list, limit: list, lo: int, hi: int) -> list:
+    """lo~hi에서 cov ≤ limit인 구간 중 양쪽에 내용이 있고 GUTTER_MIN 이상인 것 → [(시작, 끝)]"""
+    bands, start, seen = [], None, False
+    for x in range(lo, hi + 1):
+        if cov[x] <= limit[x]:
+            if seen and start is None:
+                start = x
             continue
-
-        # 텍스트 블록만
-        text_blocks = []
-        for b in raw:
+        if start is not None and x - start >= GUTTER_MIN:
+            bands.append((start, x))
+        start, seen = None, True
+    return bands
+
+def find_gutters(blocks: list, pw: float) -> list:
+    """블록 x 분포에서 세로로 빈 띠를 찾아 단 경계 x 목록을 돌려준다.
+    빈 띠 기준은 양쪽 단 중 성긴 쪽의 최댓값 대비라, 마지막 쪽처럼 한 단에 짧은 문항
+    하나만 있어도 경계를 찾는다. 그래도 못 찾으면 첫·마지막 문항 번호 줄 사이에서
+    시작하는 블록만으로(머리말·쪽 번호 제외) 완전히 빈 띠 중 양쪽에 문항 번호가
+    있는 것을 경계로 쓴다. 이때 두 단에 걸친 지문 블록(가운데 탐색 구간을 가로지르는 것)은
+    빼고 보므로, 지문으로 나뉜 위아래 띠 모두에서 비어 있는 x가 경계가 된다.
+    """
+    w = int(pw) + 2
+    cov = _coverage(blocks, w)
+    if max(cov, default=0) <= 0:
+        return []
+    left, right, acc = [0.0] * w, [0.0] * w, 0.0
+    for x in range(w):
+        acc = left[x] = max(acc, cov[x])
+    acc = 0.0
+    for x in range(w - 1, -1, -1):
+        acc = right[x] = max(acc, cov[x])
+
+    # 양쪽에 내용이 있는 빈 띠만 거터 (본문 옆 여백은 제외)
+    lo, hi = int(pw * 0.15), int(pw * 0.85)
+    limit = [GUTTER_FILL * min(left[x], right[x]) for x in range(w)]
+    bands = _bands(cov, limit, lo, hi)
+    if not bands:
+        nums = [b["bbox"] for b in blocks if b["type"] == 0 and RE_NUM.match(
+            "".join(span["text"] for line in b["lines"] for span in line["spans"]).strip())]
+        if nums:
+            top, bottom = min(n[1] for n in nums), max(n[1] for n in nums)
+            body = [b for b in blocks if top <= b["bbox"][1] <= bottom
+                    and not (b["bbox"][0] <= lo and b["bbox"][2] >= hi)]
+            bands = [(x0, x1) for x0, x1 in _bands(_coverage(body, w), [0.0] * w, lo, hi)
+                     if any(n[2] <= x0 for n in nums) and any(n[0] >= x1 for n in nums)]
+    return [(x0 + x1) / 2.0 for x0, x1 in bands]
+
+class PageLayout:
+    """페이지 블록 공간 인덱스 (페이지당 한 번 생성)
+    - 거터 검출로 단 경계 결정 (1단·2단·3단 모두)
+    - 텍스트 블록을 중심 x로 단에 배정하고 y 순으로 정렬
+    - 문항 번호·보기(①~⑤) 블록은 미리 태깅해 두고 구간 검색으로 찾음
+    """
+    def __init__(self, page, blocks: list = None):
+        self.pw, self.ph = page.rect.width, page.rect.height
+        self.blocks = page.get_text("dict")["blocks"] if blocks is None else blocks
+        self.cuts = [0.0, *find_gutters(self.blocks, self.pw), self.pw]
+        ncol = len(self.cuts) - 1
+        self.questions = [[] for _ in range(ncol)]
+        self.options   = [[] for _ in range(ncol)]
+
+        for b in self.blocks:
             if b["type"] != 0:
                 continue
             x0, y0, x1, y1 = b["bbox"]
             txt = "".join(span["text"] for line in b["lines"] for span in line["spans"]).strip()
-            text_blocks.append({"x0": x0, "y0": y0, "x1": x1, "y1": y1, "txt": txt})
-
-        # 문항 번호만
-        qblocks = [b for b in text_blocks if RE_NUM.match(b["txt"])]
-        qblocks.sort(key=lambda b: b["y0"])
-        if not qblocks:
-            log.put(("log", f"[{basename}] p{pnum}: 번호 미검출"))
-            continue
+            tb = {"x0": x0, "y0": y0, "x1": x1, "y1": y1, "txt": txt}
+            col = self.column_of((x0 + x1) / 2.0)
+            m = RE_NUM.match(txt)
+            if m:
+                tb["num"] = m.group(1).zfill(2)
+                self.questions[col].append(tb)
+            if RE_OPTION.search(txt):
+                self.options[col].append(tb)
+
+        for col in self.questions:
+            col.sort(key=lambda b: b["y0"])
+        for col in self.options:
+            col.sort(key=lambda b: b["y0"])
+        self.option_y0 = [[b["y0"] for b in col] for col in self.options]
+
+    def column_of(self, x: float) -> int:
+        return bisect_right(self.cuts, x, 1, len(self.cuts) - 1) - 1
+
+    def options_between(self, col: int, y0: float, y1: float) -> list:
+        """col 단에서 y0 ≤ 보기.y0 이고 보기.y1 ≤ y1 인 보기 블록"""
+        ys = self.option_y0[col]
+        return [b for b in self.options[col][bisect_left(ys, y0):bisect_left(ys, y1)]
+                if b["y1"] <= y1]
+
+    def crops(self, warn=None) -> list:
+        """문항별 크롭 영역 → [(side, num, (x0, y0, x1, y1)), ...] (단 순, 위→아래)
+        높이가 여백 이하인 영역(단 경계를 놓쳐 옆 단 번호가 바로 아래에 잡힌 경우 등)은
+        내보내지 않고 warn(메시지)로 알린다.
+        """
+        crops = []
+        for col, qlist in enumerate(self.questions):
+            side = f"C{col + 1}"
+            crop_x0 = self.cuts[col] + H_MARGIN
+            crop_x1 = self.cuts[col + 1] - H_MARGIN
+            for idx, qb in enumerate(qlist):
+                crop_y0 = max(0, qb["y0"] - V_MARGIN)
+                y_next = qlist[idx+1]["y0"] if idx+1 < len(qlist) else self.ph
+                opts = self.options_between(col, qb["y0"], y_next)
+                crop_y1 = (min(self.ph, max(o["y1"] for o in opts) + V_MARGIN)
+                           if opts else min(self.ph, y_next - V_MARGIN))
+                if crop_y1 <= crop_y0 + V_MARGIN:
+                    if warn:
+                        warn(f"{side} {qb['num']}번 영역 높이 {crop_y1 - crop_y0:.0f}pt — 건너뜀")
+                    continue
+                crops.append((side, qb["num"], (crop_x0, crop_y0, crop_x1, crop_y1)))
+        return crops
 
-        # 여백 및 페이지 크기
-        v_margin = 8
-        h_margin = 8
-        pw, ph = page.rect.width, page.rect.height
-        midx = pw / 2.0
-        dupe = defaultdict(int)
+GRAY_TOL = 12   # r·g·b 차이가 이 이하면 무채색
 
-        left_q  = [b for b in qblocks if b["x1"] <= midx]
-        right_q = [b for b in qblocks if b["x0"] >= midx]
+def _overlaps(bbox, clip) -> bool:
+    return bbox[0] < clip[2] and bbox[2] > clip[0] and bbox[1] < clip[3] and bbox[3] > clip[1]
 
-        for side, qlist in (("L", left_q), ("R", right_q)):
-            if not qlist:
-                continue
-            if side == "L":
-                crop_x0, crop_x1 = h_margin, midx - h_margin
-            else:
-                crop_x0, crop_x1 = midx + h_margin, pw - h_margin
+def _achromatic(rgb) -> bool:
+    """rgb: 0~255 정수 3개 또는 0~1 실수 튜플 (get_cdrawings는 회색 1개·CMYK 4개일 수도)"""
+    vals = [v * 255 if isinstance(v, float) else v for v in rgb[:3]]
+    return max(vals) - min(vals) <= GRAY_TOL
 
-            for idx, qb in enumerate(qlist):
-                m = RE_NUM.match(qb["txt"])
-                if not m:
-                    continue
-                num = m.group(1).zfill(2)
-                dupe[num] += 1
-                suffix = f"-dup{dupe[num]-1}" if dupe[num] > 1 else ""
-                crop_y0 = max(0, qb["y0"] - v_margin)
-                y_next = qlist[idx+1]["y0"] if idx+1 < len(qlist) else ph
-                opts = [
-                    b for b in text_blocks
-                    if RE_OPTION.search(b["txt"])
-                    and b["y0"] >= qb["y0"]
-                    and b["y1"] <= y_next
-                ]
-                crop_y1 = (min(ph, max(o["y1"] for o in opts) + v_margin)
-                           if opts else min(ph, y_next - v_margin))
-
-                clip = fitz.Rect(crop_x0, crop_y0, crop_x1, crop_y1)
-                try:
-                    pix = page.get_pixmap(clip=clip, dpi=300)
-                except Exception:
-                    log.put(("log", f"[{basename}] p{pnum} {side}-{num} 렌더 실패"))
-                    continue
+def _gray_image(block: dict) -> bool:
+    """그림 블록이 흑백인가. RGB로 저장된 흑백 사진도 축소본 색 차이로 가려낸다."""
+    if block.get("colorspace") == 1:
+        return True
+    try:
+        img = Image.open(io.BytesIO(block["image"]))
+        img.draft("RGB", (64, 64))
+        r, g, b = img.convert("RGB").resize((32, 32)).split()
+    except Exception:
+        return False
+    return max(ImageChops.difference(r, g).getextrema()[1],
+               ImageChops.difference(g, b).getextrema()[1]) <= GRAY_TOL
+
+def content_kind(blocks: list, drawings: list, clip) -> str:
+    """문항 영역 내용 → "text"(글자·선만) · "gray"(흑백 그림·음영) · "color"(컬러 포함)"""
+    kind = "text"
+    for b in blocks:
+        if not _overlaps(b["bbox"], clip):
+            continue
+        if b["type"] == 1:
+            if not _gray_image(b):
+                return "color"
+            kind = "gray"
+            continue
+        for line in b["lines"]:
+            for span in line["spans"]:
+                c = span["color"]
+                if span["text"].strip() and not _achromatic((c >> 16 & 255, c >> 8 & 255, c & 255)):
+                    return "color"
+    for d in drawings:
+        rect = d.get("rect")
+        if rect is None or not _overlaps(rect, clip):
+            continue
+        for c in (d.get("fill"), d.get("color")):
+            if c and not _achromatic(c):
+                return "color"
+        fill = d.get("fill")
+        if fill and 0.05 < sum(fill[:3]) / len(fill[:3]) < 0.95:
+            kind = "gray"   # 회색 음영 — 1비트로 만들면 뭉개짐
+    return kind
+
+def detect_page(page, stats: Stats = None, warn=None) -> list:
+    """페이지에서 문항별 크롭 영역 검출 → [(side, num, (x0, y0, x1, y1), 지문, 내용), ...]
+    지문(dedup.fingerprint)은 문서가 달라도 같은 문항이면 같은 값 — 렌더 재사용 키.
+    내용(content_kind)은 렌더 DPI·색공간을 고르는 데 쓴다. warn: 건너뛴 영역 알림 (PageLayout.crops)
+    """
+    stats = stats or Stats()
+    with stats.time("text"):
+        blocks = page.get_text("dict")["blocks"]
+    with stats.time("detect"):
+        crops = PageLayout(page, blocks).crops(warn)
+    with stats.time("fingerprint"):
+        drawings = page.get_cdrawings() if crops else []
+        return [(side, num, clip, fingerprint(blocks, drawings, clip),
+                 content_kind(blocks, drawings, clip))
+                for side, num, clip in crops]
+
+def name_crops(pages: list, prefix: str, fmt: str) -> list:
+    """페이지 순서대로 파일명 부여. dupe 번호는 PDF 단위로 매겨 병렬 처리와 무관하게 고정된다.
+    pages: [(pno, crops), ...] → [(pno, [(fname, side, num, clip, 지문, 내용), ...]), ...]
+    """
+    dupe = defaultdict(int)
+    named = []
+    for pno, crops in pages:
+        items = []
+        for side, num, clip, fp, kind in crops:
+            dupe[num] += 1
+            suffix = f"-dup{dupe[num]-1}" if dupe[num] > 1 else ""
+            items.append((f"{prefix}-{num}{suffix}.{fmt}", side, num, clip, fp, kind))
+        named.append((pno, items))
+    return named
+
+SLICE_MIN_CROPS = 3     # 페이지 문항 수가 이보다 적으면 문항별로 렌더
+SLICE_MIN_FILL  = 0.5   # 단 영역 중 문항이 차지하는 비율이 이보다 낮아도 문항별로 렌더
+
+def pix_to_image(pix) -> Image.Image:
+    """pixmap 버퍼를 복사 없이 감싸는 PIL 이미지 (pix가 살아 있는 동안 유효)"""
+    mode = "L" if pix.n == 1 else "RGB"
+    return Image.frombuffer(mode, (pix.width, pix.height), pix.samples_mv, "raw", mode, pix.stride, 1)
+
+def _area(r) -> float:
+    return (r[2] - r[0]) * (r[3] - r[1])
+
+# 최고 품질 인코딩의 픽셀당 바이트(가상 문제지 측정치보다 넉넉히) — 목표 용량으로 DPI 상한 추정
+BYTES_PER_PX = {("jpg", "L"): 0.12, ("jpg", "RGB"): 0.45,
+                ("webp", "L"): 0.05, ("webp", "RGB"): 0.3}
+MONO_CUT = 160   # 1비트 변환 임계값 (이보다 밝으면 흰색)
+
+def render_policy(clip, kind: str, opts: Options) -> tuple:
+    """문항 하나의 (DPI, 모드 "RGB" | "L" | "1").
+    글자뿐이거나 흑백 그림이면 L(mono면 글자뿐인 png는 1비트), 컬러가 있으면 RGB.
+    DPI는 픽셀 상한과, jpg/webp면 최고 품질로 목표 용량에 들어갈 크기로 낮춘다.
+    """
+    if not opts.gray and (kind == "color" or opts.color == "rgb"):
+        mode = "RGB"
+    elif kind == "text" and opts.color == "mono" and opts.fmt == "png":
+        mode = "1"
+    else:
+        mode = "L"
+    dpi = PREVIEW_DPI if opts.preview else DPI
+    inch2 = max(_area(clip), 1.0) / (72 * 72)
+    if (opts.fmt, mode) in BYTES_PER_PX:
+        fit = opts.target_kb * 1024 / BYTES_PER_PX[opts.fmt, mode]
+        dpi = min(dpi, max(MIN_DPI, int(math.sqrt(fit / inch2))))
+    return min(dpi, int(math.sqrt(opts.max_pixels / inch2))), mode
+
+def _to_mode(img: Image.Image, mode: str) -> Image.Image:
+    if mode == "1":
+        return img.point(lambda v: 255 if v > MONO_CUT else 0, "1")
+    return img
+
+def render_crops(page, jobs: list):
+    """문항 이미지 생성기 → (item, PIL 이미지 | 예외). jobs: [(item, (dpi, 모드)), ...]
+    페이지 디스플레이 리스트를 한 번만 만들고, 문항이 많으면 단(side)·정책별로
+    문항들을 감싸는 영역을 한 번만 렌더한 뒤 메모리에서 잘라낸다.
+    """
+    try:
+        dl = page.get_displaylist()
+    except Exception as e:
+        for item, _ in jobs:
+            yield item, e
+        return
 
-                fname = f"{prefix}-{num}{suffix}.{fmt}"
-                outp = os.path.join(out_folder, fname)
+    groups = defaultdict(list)
+    for item, policy in jobs:
+        groups[item[1], policy].append(item)
+
+    for (_, (dpi, mode)), group in groups.items():
+        mat = fitz.Matrix(dpi / 72, dpi / 72)
+        cs = fitz.csRGB if mode == "RGB" else fitz.csGRAY
+        union = fitz.Rect(group[0][3])
+        for item in group[1:]:
+            union |= item[3]
+        sliced = (len(jobs) >= SLICE_MIN_CROPS
+                  and sum(_area(it[3]) for it in group) >= SLICE_MIN_FILL * _area(union))
+        if not sliced:
+            for item in group:
                 try:
-                    pix.save(outp)
-                    if fmt == "jpg" and os.path.getsize(outp) > 500*1024:
-                        compress_jpeg(outp)
-                    log.put(("log", f"[{basename}] p{pnum} ▶ {fname}"))
-                    log.put(("thumb", outp))
+                    pix = dl.get_pixmap(matrix=mat, clip=item[3], colorspace=cs, alpha=False)
+                    yield item, _to_mode(pix_to_image(pix), mode)
                 except Exception as e:
-                    log.put(("log", f"[ERR] {fname} 저장 실패: {e}"))
+                    yield item, e
+            continue
+
+        try:
+            pix = dl.get_pixmap(matrix=mat, clip=union, colorspace=cs, alpha=False)
+            full = _to_mode(pix_to_image(pix), mode)
+        except Exception as e:
+            for item in group:
+                yield item, e
+            continue
+        for item in group:
+            # 문항별 렌더와 같은 픽셀 경계가 되도록 clip을 같은 방식으로 정수화
+            ir = (fitz.Rect(item[3]) * mat).irect
+            box = (max(0, ir.x0 - pix.x), max(0, ir.y0 - pix.y),
+                   min(pix.width, ir.x1 - pix.x), min(pix.height, ir.y1 - pix.y))
+            yield item, full.crop(box)
+        del full, pix
+
+THUMB_SIZE = 120   # 썸네일 긴 변(px)
+
+def make_thumb(img: Image.Image) -> bytes:
+    """이미 렌더한 이미지로 썸네일 PNG 생성 (디스크에서 다시 읽지 않음)"""
+    if img.mode == "1":
+        img = img.convert("L")
+    factor = max(1, max(img.size) // (THUMB_SIZE * 2))
+    th = img.reduce(factor) if factor > 1 else img.copy()
+    th.thumbnail((THUMB_SIZE, THUMB_SIZE), Image.Resampling.BILINEAR)
+    buf = io.BytesIO()
+    th.save(buf, "PNG", compress_level=1)
+    return buf.getvalue()
+
+def render_page(page, items: list, basename: str, opts: Options,
+                thumbs: bool = False) -> list:
+    """한 페이지의 문항들을 렌더·인코딩하고 이벤트 목록을 돌려준다. 파일은 쓰지 않는다.
+    인코딩 결과는 ("saved", {..., "data": 바이트})로 보내 부모가 출력 대상(sink)에 쓴다.
+    thumbs면 썸네일 PNG도 워커에서 만들어 같은 기록의 "thumb"에 넣는다.
+    """
+    pnum = page.number + 1
+    stats = Stats()
+    events = []
+    policies = {item[0]: render_policy(item[3], item[5], opts) for item in items}
+    rendered = render_crops(page, [(item, policies[item[0]]) for item in items])
+    while True:
+        nxt = img = None   # 이전 이미지는 pixmap 버퍼를 빌려 쓰므로 다음 렌더 전에 놓아 준다
+        with stats.time("render"):
+            nxt = next(rendered, None)
+        if nxt is None:
+            break
+        (fname, side, num, *_), img = nxt
+        if isinstance(img, Exception):
+            events.append(("log", f"[{basename}] p{pnum} {side}-{num} 렌더 실패"))
+            continue
 
+        try:
+            with stats.time("encode"):
+                data, quality = encode_image(img, opts.fmt, opts.target_kb, opts.gray,
+                                             opts.png_level)
+            dpi, mode = policies[fname]
+            stats.add("pixels", img.width * img.height)
+            stats.add("recompressed", quality is not None and quality < MAX_QUALITY)
+            stats.add(f"mode_{mode}")
+            rec = {"file": fname, "sha256": sha256_bytes(data), "bytes": len(data),
+                   "quality": quality, "render_dpi": dpi, "mode": mode, "data": data}
+            if thumbs:
+                with stats.time("thumb"):
+                    rec["thumb"] = make_thumb(img)
+            events.append(("saved", rec))
+        except Exception as e:
+            events.append(("log", f"[ERR] {fname} 인코딩 실패: {e}"))
+    events.append(("stats", stats.to_dict()))
+    return events
+
+def _detect(page, basename: str, log) -> list:
+    """검출 실패 시 None (캐시에 남기지 않음)"""
+    stats = Stats()
+    try:
+        return detect_page(page, stats, lambda msg: log.put(
+            ("log", f"[{basename}] p{page.number + 1} {msg}")))
+    except Exception:
+        log.put(("log", f"[{basename}] p{page.number + 1} 블록 추출 실패"))
+        return None
+    finally:
+        log.put(("stats", stats.to_dict()))
+
+def _collect(crops, pno: int, basename: str, pages: list, log):
+    if crops == []:
+        log.put(("log", f"[{basename}] p{pno + 1}: 번호 미검출"))
+    elif crops:
+        pages.append((pno, crops))
+
+def _cached_layout(pdf_path: str, cache: LayoutCache, need_hash: bool = False) -> tuple:
+    """→ (PDF 해시, {pno: crops}). 캐시도 매니페스트도 쓰지 않으면 (None, {})"""
+    key = file_hash(pdf_path) if cache is not None or need_hash else None
+    return key, (cache.get_doc(key, DETECTOR) if cache is not None else {})
+
+def _log_cache_hits(basename: str, cached: dict, n_pages: int, log):
+    if cached:
+        log.put(("log", f"[{basename}] 레이아웃 캐시 {len(cached)}/{n_pages} 페이지"))
+
+def _skip_current(named: list, key: str, opts: Options, manifest: Manifest,
+                  basename: str, log) -> tuple:
+    """매니페스트상 입력·설정이 그대로이고 파일도 온전한 문항은 렌더 목록에서 뺀다.
+    → (렌더할 [(pno, items)], {파일명: 매니페스트 입력 필드})
+    """
+    settings = {"dpi": DPI, "renderer": RENDERER, **asdict(opts)}
+    todo, inputs, skipped = [], {}, 0
+    for pno, items in named:
+        left = []
+        for item in items:
+            fname, side, num, clip, *_ = item
+            rec = {"file": fname, "src": key, "page": pno + 1, "num": num,
+                   "clip": [round(v, 2) for v in clip], **settings}
+            if manifest is not None and manifest.is_current(rec):
+                skipped += 1
+                continue
+            inputs[fname] = rec
+            left.append(item)
+        if left:
+            todo.append((pno, left))
+    if skipped:
+        log.put(("log", f"[{basename}] 변경 없음 {skipped}개 건너뜀"))
+    return todo, inputs
+
+def _dedup(todo: list, store: BlobStore, opts: Options, seen: set) -> tuple:
+    """저장소에 있거나 이번 배치에서 먼저 렌더될 문항은 렌더 목록에서 뺀다.
+    seen: 배치 전체에서 이미 렌더하기로 한 키 (PDF가 여러 개여도 한 번만 렌더)
+    → (렌더할 [(pno, items)], 재사용할 [(pno, item)], {파일명: 저장소 키})
+    """
+    if store is None:
+        return todo, [], {}
+    settings = {"dpi": DPI, "renderer": RENDERER, **asdict(opts)}
+    left, hits, keys = [], [], {}
+    for pno, items in todo:
+        render = []
+        for item in items:
+            fp = item[4]
+            if fp is None:
+                render.append(item)
+                continue
+            # 문항마다 고르는 DPI·색 모드도 키에 — 같은 지문이라도 출력이 다를 수 있음
+            policy = render_policy(item[3], item[5], opts)
+            key = keys[item[0]] = BlobStore.key(fp, {**settings, "policy": policy})
+            if key in seen or store.has(key):
+                hits.append((pno, item))
+            else:
+                seen.add(key)
+                render.append(item)
+        if render:
+            left.append((pno, render))
+    return left, hits, keys
+
+class _Router:
+    """PDF 하나의 이벤트 분배: 'saved'는 출력 대상(sink)에 쓰고 매니페스트에 기록,
+    'stats'는 배치·PDF별 통계로, 나머지(로그)는 log로 보낸다.
+    put()이 있어 log 대신 그대로 넘길 수 있다.
+    """
+    def __init__(self, log, sink: FolderSink, out_folder: str, basename: str,
+                 manifest: Manifest, stats: Stats, pdf_stats: Stats, store: BlobStore = None):
+        self.log = log
+        self.sink = sink
+        self.out_folder = out_folder
+        self.basename = basename
+        self.manifest = manifest
+        self.stats = stats
+        self.pdf_stats = pdf_stats
+        self.store = store
+        self.inputs = {}   # 파일명 → 매니페스트 입력 필드
+        self.keys = {}     # 파일명 → 중복 저장소 키
+
+    def put(self, ev: tuple):
+        key, val = ev
+        if key == "saved":
+            self.save(val)
+        elif key == "stats":
+            self.stats.merge(val)
+            self.pdf_stats.merge(val)
+        else:
+            self.log.put(ev)
+
+    def save(self, rec: dict):
+        data, thumb = rec.pop("data"), rec.pop("thumb", None)
+        fname, quality = rec["file"], rec["quality"]
+        written = Stats()
+        try:
+            with written.time("write"):
+                loc = self.sink.write(self.out_folder, fname, data)
+        except Exception as e:
+            self.log.put(("log", f"[ERR] {fname} 저장 실패: {e}"))
+            return
+        written.add("crops")
+        written.add("bytes", len(data))
+        self.put(("stats", written.to_dict()))
+        note = f" (q={quality})" if quality is not None and quality < MAX_QUALITY else ""
+        self.log.put(("log", f"[{self.basename}] p{self.inputs[fname]['page']} ▶ {fname}{note}"))
+        key = self.keys.get(fname)
+        if self.store is not None and key is not None:
+            src = loc if self.sink.kind == "folder" else None
+            try:
+                self.store.put(key, data, rec["sha256"], quality, src)
+                rec["blob"] = key
+            except Exception as e:   # 저장소 문제로 이미 쓴 문항·배치를 버리지 않는다
+                self.log.put(("log", f"[WARN] {fname} 중복 저장소 기록 실패: {e}"))
+        self._done(fname, loc, thumb, rec)
+
+    def _done(self, fname: str, loc: str, thumb: bytes, rec: dict):
+        if thumb is not None:
+            self.log.put(("thumb", (loc, thumb)))
+        if self.manifest is not None:
+            self.manifest.add({**self.inputs[fname], **rec})
+
+    def reuse(self, hits: list, pdf_path: str, opts: Options, thumbs: bool):
+        """중복 문항을 저장소 바이트로 출력. 폴더면 하드 링크, 묶음 파일이면 바이트를 씀.
+        저장소 항목이 없어졌거나 망가졌으면 이 프로세스에서 렌더한다.
+        """
+        for pno, item in hits:
+            fname, key = item[0], self.keys[item[0]]
+            try:
+                got = self.store.get(key)
+            except Exception as e:
+                self.log.put(("log", f"[WARN] {fname} 중복 저장소 읽기 실패: {e}"))
+                got = None
+            if got is None:
+                for ev in render_page(_open_doc(pdf_path)[pno], [item], self.basename,
+                                      opts, thumbs):
+                    self.put(ev)
+                continue
+            data, meta = got
+            written = Stats()
+            try:
+                with written.time("write"):
+                    dst = os.path.join(self.out_folder, fname)
+                    linked = self.sink.kind == "folder" and self.store.link(key, dst)
+                    loc = dst if linked else self.sink.write(self.out_folder, fname, data)
+            except Exception as e:
+                self.log.put(("log", f"[ERR] {fname} 저장 실패: {e}"))
+                continue
+            written.add("crops")
+            written.add("bytes", len(data))
+            written.add("dedup")
+            written.add("dedup_linked", linked)
+            self.put(("stats", written.to_dict()))
+            self.log.put(("log", f"[{self.basename}] p{pno + 1} ≡ {fname} (중복 재사용)"))
+            self._done(fname, loc, make_thumb(Image.open(io.BytesIO(data))) if thumbs else None,
+                       {"file": fname, **meta, "blob": key})
+
+def process_pdf(pdf_path: str, prefix: str, out_folder: str, opts: Options, log: queue.Queue,
+                cache: LayoutCache = None, manifest: Manifest = None, thumbs: bool = False,
+                stats: Stats = None, sink: FolderSink = None, store: BlobStore = None,
+                seen: set = None, cancel: threading.Event = None):
+    basename = Path(pdf_path).stem
+    pdf_stats = Stats()
+    router = _Router(log, sink or FolderSink(), out_folder, basename, manifest,
+                     stats or Stats(), pdf_stats, store)
+    log.put(("log", f"[{basename}] 처리 시작"))
+    try:
+        doc = fitz.open(pdf_path)
+        key, cached = _cached_layout(pdf_path, cache, manifest is not None)
+    except Exception as e:
+        log.put(("log", f"[ERR] '{basename}' 열기 실패: {e}"))
+        return pdf_stats
+
+    _log_cache_hits(basename, cached, doc.page_count, router)
+    router.stats.add("pages", doc.page_count)
+    pdf_stats.add("pages", doc.page_count)
+    pages, fresh = [], {}
+    for page in doc:
+        crops = cached.get(page.number)
+        if crops is None:
+            crops = _detect(page, basename, router)
+            if crops is not None:
+                fresh[page.number] = crops
+        _collect(crops, page.number, basename, pages, router)
+    if cache is not None and fresh:
+        cache.put_doc(key, DETECTOR, fresh)
+
+    todo, router.inputs = _skip_current(name_crops(pages, prefix, opts.fmt), key, opts,
+                                        manifest, basename, router)
+    todo, hits, router.keys = _dedup(todo, store, opts, set() if seen is None else seen)
+    for pno, items in todo:
+        if cancel is not None and cancel.is_set():
+            log.put(("log", f"[{basename}] 취소됨"))
+            doc.close()
+            return pdf_stats
+        for ev in render_page(doc[pno], items, basename, opts, thumbs):
+            router.put(ev)
+    router.reuse(hits, pdf_path, opts, thumbs)
+
+    doc.close()
     log.put(("log", f"[{basename}] 완료"))
+    return pdf_stats
 
 # ──────────────────────────────────────
-#### 이하 GUI 부분 ####
-
-class App(tk.Tk):
-    def __init__(self):
-        super().__init__()
-        self.title("문제 커팅기")
-        self.geometry("900x700")
-        self.grid_columnconfigure(1, weight=1)
-        self.grid_rowconfigure(5, weight=1)
-
-        # 1) PDF 선택
-        tk.Label(self, text="1) PDF 파일 선택").grid(row=0, column=0, sticky="w", padx=8, pady=4)
-        self.pdf = tk.Entry(self, width=80);   self.pdf.grid(row=0, column=1, sticky="we", padx=4)
-        tk.Button(self, text="Browse", command=self.sel_pdf).grid(row=0, column=2)
-
-        # 2) 접두어
-        tk.Label(self, text="2) 접두어").grid(row=1, column=0, sticky="w", padx=8)
-        self.pref = tk.Text(self, height=2);    self.pref.grid(row=1, column=1, columnspan=2, sticky="we", padx=4)
-
-        # 3) 출력 폴더
-        tk.Label(self, text="3) 출력 폴더").grid(row=2, column=0, sticky="w", padx=8)
-        self.out  = tk.Entry(self, width=80);   self.out.grid(row=2, column=1, sticky="we", padx=4)
-        tk.Button(self, text="Browse", command=self.sel_out).grid(row=2, column=2)
-
-        # 4) 이미지 형식
-        tk.Label(self, text="4) 이미지 형식").grid(row=3, column=0, sticky="w", padx=8)
-        self.fmt = ttk.Combobox(self, values=["png","jpg"], state="readonly", width=10)
-        self.fmt.current(0);                    self.fmt.grid(row=3, column=1, sticky="w", padx=4)
-
-        # 시작/종료 버튼 프레임
-        bf = tk.Frame(self); bf.grid(row=4, column=1, sticky="e", pady=8)
-        self.btn = tk.Button(bf, text="시작", command=self.start); self.btn.pack(side="left", padx=5)
-        tk.Button(bf, text="종료", command=self.destroy).pack(side="left", padx=5)
-
-        # 로그
-        tk.Label(self, text="로그").grid(row=5, column=0, sticky="nw", padx=8)
-        self.log = scrolledtext.ScrolledText(self, state="disabled", height=15)
-        self.log.grid(row=5, column=1, columnspan=2, sticky="nsew", padx=8, pady=4)
-
-        # 썸네일 영역
-        tk.Label(self, text="썸네일").grid(row=6, column=0, sticky="w", padx=8)
-        self.canvas = tk.Canvas(self, height=140, bg="#f0f0f0")
-        self.canvas.grid(row=7, column=0, columnspan=3, sticky="we", padx=8)
-        sb = tk.Scrollbar(self, orient="horizontal", command=self.canvas.xview)
-        sb.grid(row=8, column=0, columnspan=3, sticky="we")
-        self.canvas.configure(xscrollcommand=sb.set)
-        self.tf = tk.Frame(self.canvas)
-        self.canvas.create_window((0,0), window=self.tf, anchor="nw")
-        self.tf.bind("<Configure>", lambda e: self.canvas.configure(scrollregion=self.canvas.bbox("all")))
-
-        self.thumbs = []
-        self.q = queue.Queue()
-        self.after(100, self.poll)
-
-    def sel_pdf(self):
-        fs = filedialog.askopenfilenames(filetypes=[("PDF","*.pdf")])
-        if fs:
-            self.pdf.delete(0, tk.END)
-            self.pdf.insert(0, ";".join(fs))
-
-    def sel_out(self):
-        d = filedialog.askdirectory()
-        if d:
-            self.out.delete(0, tk.END)
-            self.out.insert(0, d)
-
-    def log_put(self, msg):
-        self.log.configure(state="normal")
-        self.log.insert(tk.END, msg+"\n")
-        self.log.see("end")
-        self.log.configure(state="disabled")
-
-    def add_thumb(self, path):
-        im = Image.open(path)
-        im.thumbnail((120,120), Image.Resampling.LANCZOS)
-        ph = ImageTk.PhotoImage(im)
-        lbl = tk.Label(self.tf, image=ph, cursor="hand2")
-        lbl.image = ph
-        lbl.pack(side="left", padx=4, pady=4)
-        lbl.bind("<Button-1>", lambda e, p=path: self.open_folder(p))
-        self.thumbs.append(ph)
-
-    def open_folder(self, path):
-        """썸네일 클릭 시 해당 파일의 폴더(또는 파일 자체 위치)를 엽니다."""
-        if sys.platform == "darwin":
-            subprocess.run(["open", "-R", path])
-        elif sys.platform == "win32":
-            subprocess.run(["explorer", "/select,", path])
+#### 배치 엔진 (GUI 없이 프로세스 풀로 페이지 단위 병렬 처리) ####
+
+_docs = {}   # 워커 프로세스마다 따로 열어 두는 fitz 문서: 경로 → (파일 상태, 문서)
+
+def _open_doc(pdf_path: str):
+    # 상주 워커(service.py)는 배치가 바뀌어도 살아 있으므로 같은 경로의 파일이 바뀌면 다시 연다
+    st = os.stat(pdf_path)
+    sig = (st.st_mtime_ns, st.st_size)
+    old = _docs.get(pdf_path)
+    if old is not None and old[0] == sig:
+        return old[1]
+    if old is not None:
+        _docs.pop(pdf_path)[1].close()
+    elif len(_docs) >= 4:
+        _docs.pop(next(iter(_docs)))[1].close()
+    doc = fitz.open(pdf_path)
+    _docs[pdf_path] = (sig, doc)
+    return doc
+
+def _detect_task(pdf_path: str, pno: int) -> tuple:
+    page = _open_doc(pdf_path)[pno]
+    events = []
+    crops = _detect(page, Path(pdf_path).stem, _ListLog(events))
+    return crops, events
+
+def _render_task(pdf_path: str, pno: int, items: list, opts: Options, thumbs: bool) -> list:
+    page = _open_doc(pdf_path)[pno]
+    return render_page(page, items, Path(pdf_path).stem, opts, thumbs)
+
+class _ListLog:
+    """log.put() 인터페이스를 리스트에 쌓는 어댑터 (워커 → 부모로 반환)"""
+    def __init__(self, events: list):
+        self.put = events.append
+
+def run_batch(jobs: list, opts: Options, log, workers: int = None, cache: LayoutCache = None,
+              resume: bool = True, thumbs: bool = False, sink: FolderSink = None,
+              store: BlobStore = None, executor: ProcessPoolExecutor = None,
+              cancel: threading.Event = None) -> dict:
+    """jobs: [(pdf_path, prefix, out_folder), ...]
+    검출·렌더를 페이지 단위 작업으로 쪼개 ProcessPoolExecutor에 분산한다.
+    로그 순서와 파일명(dupe 번호)은 workers 수와 무관하게 동일하다.
+    cache가 있으면 이미 검출한 페이지는 검출 작업 없이 바로 렌더로 넘어간다.
+    resume이면 출력 폴더의 매니페스트를 보고 바뀌지 않은 문항은 다시 만들지 않는다
+    (폴더 출력일 때만 — 묶음 파일은 매번 새로 쓴다).
+    워커는 인코딩한 바이트만 돌려주고 쓰기는 이 프로세스가 sink(기본: 폴더)에 한다.
+    store가 있으면 지문이 같은 문항은 한 번만 렌더하고 나머지는 저장소에서 가져온다.
+    thumbs면 워커가 썸네일까지 만들어 보낸다 (GUI용).
+    executor를 주면 그 풀(상주 워커)을 쓰고 끝나도 닫지 않는다.
+    cancel이 설정되면 남은 작업을 버리고 돌아온다 (리포트에 "cancelled": True).
+    → 성능 리포트 dict (perf.build_report). PDF가 끝날 때마다 ("perf", 요약 문자열)도 보낸다.
+    """
+    workers = workers or os.cpu_count() or 1
+    sink = sink or FolderSink()
+    cancel = cancel or threading.Event()
+    manifests = {}
+    seen = set()   # 이번 배치에서 렌더하기로 한 저장소 키
+    stats, pdfs = Stats(), {}
+    t0 = time.perf_counter()
+
+    def manifest_for(folder):
+        if not (resume and sink.resumable):
+            return None
+        if folder not in manifests:
+            manifests[folder] = Manifest(folder)
+        return manifests[folder]
+
+    def pdf_done(pdf_path, pdf_stats):
+        pdfs[Path(pdf_path).name] = pdf_stats
+        log.put(("perf", stats.summary(time.perf_counter() - t0)))
+
+    try:
+        if workers == 1 and executor is None:
+            for pdf_path, prefix, out_folder in jobs:
+                if cancel.is_set():
+                    break
+                pdf_stats = process_pdf(pdf_path, prefix, out_folder, opts, log, cache,
+                                        manifest_for(out_folder), thumbs, stats, sink, store,
+                                        seen, cancel)
+                pdf_done(pdf_path, pdf_stats)
         else:
-            # Linux 등
-            subprocess.run(["xdg-open", os.path.dirname(path)])
-
-    def poll(self):
-        while not self.q.empty():
-            key, val = self.q.get_nowait()
-            if key == "log":
-                self.log_put(val)
-            elif key == "thumb":
-                self.add_thumb(val)
-            elif key == "enable":
-                self.btn.config(state="normal")
-        self.after(100, self.poll)
-
-    def start(self):
-        pdfs  = [p for p in self.pdf.get().split(";") if p]
-        prefs = [x for x in re.split(r'[,\n]+', self.pref.get("1.0","end")) if x]
-        outd  = self.out.get().strip()
-        fmt   = self.fmt.get()
-        if not pdfs:
-            return messagebox.showerror("ERR", "PDF 선택")
-        if not prefs:
-            return messagebox.showerror("ERR", "접두어 입력")
-        if len(prefs) not in (1, len(pdfs)):
-            return messagebox.showerror("ERR", "접두어 수 오류")
-        if not outd:
-            return messagebox.showerror("ERR", "출력 폴더 선택")
-
-        for w in self.tf.winfo_children():
-            w.destroy()
-        self.thumbs.clear()
-        self.log_put("=== 작업 시작 ===")
-        self.btn.config(state="disabled")
-
-        def worker():
-            for i, p in enumerate(pdfs):
-                pre = prefs[i] if len(prefs)>1 else prefs[0]
-                tgt = os.path.join(outd, pre)
-                os.makedirs(tgt, exist_ok=True)
-                process_pdf(p, pre, tgt, fmt, self.q)
-            self.q.put(("log","=== 완료 ==="))
-            self.q.put(("enable",None))
-
-        threading.Thread(target=worker, daemon=True).start()
+            with nullcontext(executor) if executor else ProcessPoolExecutor(workers) as ex:
+                _run_pool(jobs, opts, log, ex, cache, manifest_for, thumbs, stats, pdf_done,
+                          sink, store, seen, cancel)
+    finally:
+        for m in manifests.values():
+            m.close()
+
+    wall = time.perf_counter() - t0
+    if cancel.is_set():
+        log.put(("log", "=== 취소됨 ==="))
+    log.put(("log", f"=== {stats.summary(wall)} ==="))
+    return build_report(stats, wall, pdfs, workers=workers, sink=sink.kind,
+                        cancelled=cancel.is_set(), options={"dpi": DPI, "renderer": RENDERER, **asdict(opts)})
+
+def _run_pool(jobs: list, opts: Options, log, ex: ProcessPoolExecutor, cache: LayoutCache,
+              manifest_for, thumbs: bool, stats: Stats, pdf_done, sink: FolderSink,
+              store: BlobStore, seen: set, cancel: threading.Event):
+    pending = []   # 제출한 작업 — 취소 시 아직 시작 안 한 것은 버린다
+    try:
+        def submit(*args):
+            fut = ex.submit(*args)
+            pending.append(fut)
+            return fut
+
+        # 1) 캐시에 없는 페이지의 검출 작업을 먼저 모두 던져 둔다 (가벼운 작업)
+        detects = []
+        for pdf_path, prefix, out_folder in jobs:
+            basename = Path(pdf_path).stem
+            manifest = manifest_for(out_folder)
+            try:
+                with fitz.open(pdf_path) as doc:
+                    n = doc.page_count
+                key, cached = _cached_layout(pdf_path, cache, manifest is not None)
+            except Exception as e:
+                detects.append((basename, None, e))
+                continue
+            futs = [None if pno in cached else submit(_detect_task, pdf_path, pno)
+                    for pno in range(n)]
+            detects.append((basename, (pdf_path, prefix, out_folder, key, cached, manifest), futs))
+
+        # 2) PDF별로 검출 결과를 페이지 순서대로 모아 파일명을 정하고 렌더 작업 제출
+        #    (로그 순서를 지키려고 이벤트는 모아 두었다가 3)에서 내보낸다)
+        renders = []
+        for basename, job, futs in detects:
+            if cancel.is_set():
+                break
+            events = [("log", f"[{basename}] 처리 시작")]
+            if job is None:
+                events.append(("log", f"[ERR] '{basename}' 열기 실패: {futs}"))
+                renders.append((basename, events, None))
+                continue
+            pdf_path, prefix, out_folder, key, cached, manifest = job
+            elog = _ListLog(events)
+            _log_cache_hits(basename, cached, len(futs), elog)
+            pages, fresh = [], {}
+            for pno, fut in enumerate(futs):
+                if fut is None:
+                    crops = cached[pno]
+                else:
+                    crops, page_events = fut.result()
+                    events.extend(page_events)
+                    if crops is not None:
+                        fresh[pno] = crops
+                _collect(crops, pno, basename, pages, elog)
+            if cache is not None and fresh:
+                cache.put_doc(key, DETECTOR, fresh)
+            todo, inputs = _skip_current(name_crops(pages, prefix, opts.fmt), key, opts,
+                                         manifest, basename, elog)
+            todo, hits, keys = _dedup(todo, store, opts, seen)
+            rfuts = [submit(_render_task, pdf_path, pno, items, opts, thumbs)
+                     for pno, items in todo]
+            renders.append((basename, events, (pdf_path, out_folder, len(futs), rfuts, manifest,
+                                               inputs, hits, keys)))
+
+        # 3) PDF 순서대로 로그·렌더 결과 전달
+        for basename, events, job in renders:
+            if job is None:
+                for ev in events:
+                    log.put(ev)
+                continue
+            pdf_path, out_folder, n_pages, rfuts, manifest, inputs, hits, keys = job
+            pdf_stats = Stats()
+            router = _Router(log, sink, out_folder, basename, manifest, stats, pdf_stats, store)
+            router.inputs, router.keys = inputs, keys
+            router.stats.add("pages", n_pages)
+            pdf_stats.add("pages", n_pages)
+            for ev in events:
+                router.put(ev)
+            for fut in rfuts:
+                if cancel.is_set():
+                    log.put(("log", f"[{basename}] 취소됨"))
+                    return
+                for ev in fut.result():
+                    router.put(ev)
+            router.reuse(hits, pdf_path, opts, thumbs)
+            log.put(("log", f"[{basename}] 완료"))
+            pdf_done(pdf_path, pdf_stats)
+    finally:
+        for fut in pending:
+            fut.cancel()   # 정상 종료면 모두 끝난 뒤라 아무 일 없음
+
+class _PrintLog:
+    """CLI용: log.put() 으로 들어온 로그를 바로 출력"""
+    def put(self, item):
+        key, val = item
+        if key == "log":
+            print(val, flush=True)
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="cut_questions",
+                                 description="PDF 문제지 → 문항 단위 이미지 일괄 변환")
+    ap.add_argument("pdfs", nargs="+", help="입력 PDF 파일")
+    ap.add_argument("-o", "--out", default=".", help="출력 폴더 (접두어별 하위 폴더 생성)")
+    ap.add_argument("-p", "--prefix", action="append",
+                    help="접두어 (1개 또는 PDF 수만큼, 기본: PDF 파일명)")
+    ap.add_argument("-f", "--fmt", choices=list(FORMATS), default="png", help="이미지 형식")
+    ap.add_argument("--gray", action="store_true", help="흑백으로 렌더·저장")
+    ap.add_argument("--target-kb", type=int, default=TARGET_KB, help="jpg/webp 목표 용량(KB)")
+    ap.add_argument("--png-level", type=int, choices=range(10), default=PNG_LEVEL,
+                    metavar="0-9", help="png 압축 레벨 (1: 인코딩 빠름, 9: 용량 최소)")
+    ap.add_argument("--color", choices=COLORS, default="auto",
+                    help="auto: 컬러가 있는 문항만 컬러, rgb: 모두 컬러, mono: 글자뿐인 png는 1비트")
+    ap.add_argument("--preview", action="store_true",
+                    help=f"확인용 저해상도({PREVIEW_DPI} DPI)로 빠르게 출력")
+    ap.add_argument("--max-pixels", type=int, default=MAX_PIXELS,
+                    help="문항 한 장 픽셀 상한 (넘으면 DPI를 낮춤)")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="워커 프로세스 수")
+    ap.add_argument("--no-cache", action="store_true", help="레이아웃 캐시를 쓰지 않음")
+    ap.add_argument("--clear-cache", action="store_true",
+                    help="레이아웃 캐시와 중복 저장소를 비우고 시작")
+    ap.add_argument("--no-dedup", action="store_true",
+                    help="문서 간 중복 문항 재사용 안 함 (모든 문항을 렌더)")
+    ap.add_argument("--force", action="store_true",
+                    help="매니페스트·중복 저장소를 무시하고 모든 문항을 다시 렌더")
+    ap.add_argument("--sink", choices=KINDS, default="folder",
+                    help="출력 방식: 낱개 파일(folder) 또는 묶음 파일 하나(zip·tar·pack)")
+    ap.add_argument("--archive", metavar="FILE",
+                    help="묶음 파일 경로 (기본: 출력 폴더/questions.<sink>)")
+    ap.add_argument("--report", default=None,
+                    help="성능 리포트(JSON) 폴더 (기본: 출력 폴더, '-'면 저장 안 함)")
+    ap.add_argument("--profile", metavar="FILE", help="cProfile 결과 저장 (이 프로세스만)")
+    ap.add_argument("--tracemalloc", action="store_true", help="이 프로세스 최대 메모리 기록")
+    args = ap.parse_args(argv)
+
+    prefs = args.prefix or [Path(p).stem for p in args.pdfs]
+    if len(prefs) not in (1, len(args.pdfs)):
+        ap.error("접두어 수 오류")
+
+    jobs = []
+    for i, p in enumerate(args.pdfs):
+        pre = prefs[i] if len(prefs) > 1 else prefs[0]
+        tgt = os.path.join(args.out, pre)
+        if args.sink == "folder":
+            os.makedirs(tgt, exist_ok=True)
+        jobs.append((p, pre, tgt))
+    opts = Options(fmt=args.fmt, gray=args.gray, target_kb=args.target_kb,
+                   png_level=args.png_level, color=args.color,
+                   preview=args.preview, max_pixels=args.max_pixels)
+    archive = args.archive or os.path.join(args.out, f"questions.{args.sink}")
+    sink = open_sink(args.sink, archive, root=args.out)
+    cache = None if args.no_cache else LayoutCache()
+    store = None if args.no_dedup or args.force else BlobStore()
+    if args.clear_cache:
+        for c in (cache, store):
+            if c is not None:
+                c.clear()
+    try:
+        with profiled(args.profile, args.tracemalloc) as prof:
+            report = run_batch(jobs, opts, _PrintLog(), workers=args.jobs, cache=cache,
+                               resume=not args.force, sink=sink, store=store)
+    finally:
+        sink.close()
+        for c in (cache, store):
+            if c is not None:
+                c.close()
+    if args.sink != "folder":
+        print("묶음 파일:", archive)
+    report.update(prof)
+    if args.report != "-":
+        print("성능 리포트:", write_report(args.report or args.out, report))
+    return 0
 
 if __name__ == "__main__":
-    missing = []
-    for m,pkg in [("fitz","PyMuPDF"), ("PIL","Pillow")]:
-        try: __import__(m)
-        except ImportError:
-            missing.append(pkg)
-    if missing:
-        print("필요 패키지:", ", ".join(missing))
-        sys.exit(1)
-    App().mainloop()
+    multiprocessing.freeze_support()
+    if len(sys.argv) > 1:
+        sys.exit(main())
+    from cut_questions_gui import run_gui   # 인자가 없으면 GUI (tkinter는 이때만 로드)
+    sys.exit(run_gui())
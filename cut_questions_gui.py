@@ -0,0 +1,277 @@
+# 파일명: cut_questions_gui.py
+"""
+문제 커팅기 Tk 화면 (cut_questions.py를 인자 없이 실행하면 뜸)
+- service.py가 떠 있으면 작업을 서비스로 보내고 진행 상황만 받아 보여 줌
+  (워커가 이미 떠 있으므로 시작이 빠름, 썸네일은 없음)
+- 아니면 이 프로세스에서 직접 run_batch
+"""
+import io
+import os
+import re
+import sys
+import queue
+import time
+import threading
+import subprocess
+from collections import deque
+
+from PIL import Image, ImageTk  # pip install pillow
+
+import tkinter as tk
+from tkinter import filedialog, messagebox, scrolledtext, ttk
+
+from cut_questions import FORMATS, KINDS, THUMB_SIZE, Options, run_batch
+from dedup import BlobStore
+from layout_cache import LayoutCache
+from perf import write_report
+from service import Client
+from sinks import open_sink
+
+THUMB_SLOT = THUMB_SIZE + 8   # 썸네일 한 칸 폭(px)
+THUMB_MAX  = 5000             # 보관할 썸네일 최대 개수 (넘으면 오래된 것부터 버림)
+POLL_SEC   = 0.5              # 서비스 작업 상태 확인 간격
+
+class App(tk.Tk):
+    def __init__(self):
+        super().__init__()
+        self.title("문제 커팅기")
+        self.geometry("900x700")
+        self.grid_columnconfigure(1, weight=1)
+        self.grid_rowconfigure(5, weight=1)
+
+        # 1) PDF 선택
+        tk.Label(self, text="1) PDF 파일 선택").grid(row=0, column=0, sticky="w", padx=8, pady=4)
+        self.pdf = tk.Entry(self, width=80);   self.pdf.grid(row=0, column=1, sticky="we", padx=4)
+        tk.Button(self, text="Browse", command=self.sel_pdf).grid(row=0, column=2)
+
+        # 2) 접두어
+        tk.Label(self, text="2) 접두어").grid(row=1, column=0, sticky="w", padx=8)
+        self.pref = tk.Text(self, height=2);    self.pref.grid(row=1, column=1, columnspan=2, sticky="we", padx=4)
+
+        # 3) 출력 폴더
+        tk.Label(self, text="3) 출력 폴더").grid(row=2, column=0, sticky="w", padx=8)
+        self.out  = tk.Entry(self, width=80);   self.out.grid(row=2, column=1, sticky="we", padx=4)
+        tk.Button(self, text="Browse", command=self.sel_out).grid(row=2, column=2)
+
+        # 4) 이미지 형식
+        tk.Label(self, text="4) 이미지 형식").grid(row=3, column=0, sticky="w", padx=8)
+        of = tk.Frame(self); of.grid(row=3, column=1, sticky="w", padx=4)
+        self.fmt = ttk.Combobox(of, values=list(FORMATS), state="readonly", width=10)
+        self.fmt.current(0);                    self.fmt.pack(side="left")
+        tk.Label(of, text="저장 방식").pack(side="left", padx=(12, 4))
+        self.sink = ttk.Combobox(of, values=KINDS, state="readonly", width=8)
+        self.sink.current(0);                   self.sink.pack(side="left")
+        self.preview = tk.BooleanVar(value=False)
+        tk.Checkbutton(of, text="미리보기(저해상도)", variable=self.preview).pack(side="left", padx=(12, 0))
+        self.gray = tk.BooleanVar(value=False)
+        tk.Checkbutton(self, text="흑백", variable=self.gray).grid(row=3, column=2, sticky="w")
+
+        # 시작/취소/종료 버튼 프레임
+        bf = tk.Frame(self); bf.grid(row=4, column=1, sticky="e", pady=8)
+        self.perf = tk.Label(self, text="", fg="#555")
+        self.perf.grid(row=4, column=1, sticky="w", padx=4)
+        self.btn = tk.Button(bf, text="시작", command=self.start); self.btn.pack(side="left", padx=5)
+        self.stop = tk.Button(bf, text="취소", command=self.cancel, state="disabled")
+        self.stop.pack(side="left", padx=5)
+        tk.Button(bf, text="종료", command=self.destroy).pack(side="left", padx=5)
+
+        # 로그
+        tk.Label(self, text="로그").grid(row=5, column=0, sticky="nw", padx=8)
+        self.log = scrolledtext.ScrolledText(self, state="disabled", height=15)
+        self.log.grid(row=5, column=1, columnspan=2, sticky="nsew", padx=8, pady=4)
+
+        # 썸네일 영역
+        tk.Label(self, text="썸네일").grid(row=6, column=0, sticky="w", padx=8)
+        self.canvas = tk.Canvas(self, height=140, bg="#f0f0f0", cursor="hand2")
+        self.canvas.grid(row=7, column=0, columnspan=3, sticky="we", padx=8)
+        sb = tk.Scrollbar(self, orient="horizontal", command=self.scroll_thumbs)
+        sb.grid(row=8, column=0, columnspan=3, sticky="we")
+        self.canvas.configure(xscrollcommand=sb.set)
+        self.canvas.bind("<Configure>", lambda e: self.show_thumbs())
+        self.canvas.bind("<Button-1>", self.click_thumb)
+
+        # 썸네일은 (경로, PNG 바이트)로만 보관하고, 화면에 보이는 칸만 Tk 이미지를 만든다
+        self.thumbs = deque(maxlen=THUMB_MAX)
+        self.shown = {}   # 칸 번호 → (캔버스 항목, PhotoImage)
+        self.q = queue.Queue()
+        self.cancel_ev = threading.Event()
+        self.client, self.job_id = Client(), None
+        self.after(100, self.poll)
+
+    def sel_pdf(self):
+        fs = filedialog.askopenfilenames(filetypes=[("PDF","*.pdf")])
+        if fs:
+            self.pdf.delete(0, tk.END)
+            self.pdf.insert(0, ";".join(fs))
+
+    def sel_out(self):
+        d = filedialog.askdirectory()
+        if d:
+            self.out.delete(0, tk.END)
+            self.out.insert(0, d)
+
+    def log_put(self, msg):
+        self.log.configure(state="normal")
+        self.log.insert(tk.END, msg+"\n")
+        self.log.see("end")
+        self.log.configure(state="disabled")
+
+    def clear_thumbs(self):
+        self.canvas.delete("all")
+        self.thumbs.clear()
+        self.shown.clear()
+        self.canvas.configure(scrollregion=(0, 0, 0, THUMB_SLOT))
+
+    def scroll_thumbs(self, *args):
+        self.canvas.xview(*args)
+        self.show_thumbs()
+
+    def show_thumbs(self):
+        """보이는 칸의 썸네일만 Tk 이미지로 만들고, 벗어난 칸은 해제"""
+        x0 = self.canvas.canvasx(0)
+        first = max(0, int(x0 // THUMB_SLOT))
+        last = min(len(self.thumbs), int((x0 + self.canvas.winfo_width()) // THUMB_SLOT) + 1)
+        for i in [i for i in self.shown if not first <= i < last]:
+            self.canvas.delete(self.shown.pop(i)[0])
+        for i in range(first, last):
+            if i not in self.shown:
+                ph = ImageTk.PhotoImage(Image.open(io.BytesIO(self.thumbs[i][1])))
+                item = self.canvas.create_image(i * THUMB_SLOT + 4, 4, image=ph, anchor="nw")
+                self.shown[i] = (item, ph)
+
+    def click_thumb(self, event):
+        i = int(self.canvas.canvasx(event.x) // THUMB_SLOT)
+        if i < len(self.thumbs):
+            self.open_folder(self.thumbs[i][0])
+
+    def open_folder(self, path):
+        """썸네일 클릭 시 해당 파일의 폴더(또는 파일 자체 위치)를 엽니다."""
+        if sys.platform == "darwin":
+            subprocess.run(["open", "-R", path])
+        elif sys.platform == "win32":
+            subprocess.run(["explorer", "/select,", path])
+        else:
+            # Linux 등
+            subprocess.run(["xdg-open", os.path.dirname(path)])
+
+    def poll(self):
+        # 한 번에 모아서 로그는 한 번만 insert, 썸네일 영역도 한 번만 갱신
+        lines, new_thumbs = [], 0
+        while not self.q.empty():
+            key, val = self.q.get_nowait()
+            if key == "log":
+                lines.append(val)
+            elif key == "thumb":
+                if len(self.thumbs) == self.thumbs.maxlen:
+                    # 가장 오래된 썸네일이 밀려나면 칸 번호가 바뀌므로 다시 그림
+                    self.canvas.delete("all")
+                    self.shown.clear()
+                self.thumbs.append(val)
+                new_thumbs += 1
+            elif key == "perf":
+                self.perf.config(text=val)
+            elif key == "enable":
+                self.btn.config(state="normal")
+                self.stop.config(state="disabled")
+        if lines:
+            self.log_put("\n".join(lines))
+        if new_thumbs:
+            self.canvas.configure(scrollregion=(0, 0, len(self.thumbs) * THUMB_SLOT, THUMB_SLOT))
+            self.show_thumbs()
+        self.after(100, self.poll)
+
+    def cancel(self):
+        self.stop.config(state="disabled")
+        self.log_put("취소 요청 — 진행 중인 페이지까지만 처리")
+        if self.job_id is not None:
+            threading.Thread(target=self.client.cancel, args=(self.job_id,), daemon=True).start()
+        else:
+            self.cancel_ev.set()
+
+    def start(self):
+        pdfs  = [p for p in self.pdf.get().split(";") if p]
+        prefs = [x for x in re.split(r'[,\n]+', self.pref.get("1.0","end")) if x]
+        outd  = self.out.get().strip()
+        opts  = Options(fmt=self.fmt.get(), gray=self.gray.get(), preview=self.preview.get())
+        kind  = self.sink.get()
+        if not pdfs:
+            return messagebox.showerror("ERR", "PDF 선택")
+        if not prefs:
+            return messagebox.showerror("ERR", "접두어 입력")
+        if len(prefs) not in (1, len(pdfs)):
+            return messagebox.showerror("ERR", "접두어 수 오류")
+        if not outd:
+            return messagebox.showerror("ERR", "출력 폴더 선택")
+
+        self.clear_thumbs()
+        self.perf.config(text="")
+        self.log_put("=== 작업 시작 ===")
+        self.btn.config(state="disabled")
+        self.stop.config(state="normal")
+        self.cancel_ev = threading.Event()
+        self.job_id = None
+
+        def worker():
+            try:
+                jobs = []
+                for i, p in enumerate(pdfs):
+                    pre = prefs[i] if len(prefs)>1 else prefs[0]
+                    tgt = os.path.join(outd, pre)
+                    if kind == "folder":
+                        os.makedirs(tgt, exist_ok=True)
+                    jobs.append((p, pre, tgt))
+                archive = os.path.join(outd, time.strftime(f"questions-%Y%m%d-%H%M%S.{kind}"))
+                with LayoutCache() as cache, BlobStore() as store, \
+                        open_sink(kind, archive, root=outd) as sink:
+                    report = run_batch(jobs, opts, self.q, cache=cache, thumbs=True, sink=sink,
+                                       store=store, cancel=self.cancel_ev)
+                if kind != "folder":
+                    self.q.put(("log", f"묶음 파일: {archive}"))
+                self.q.put(("log", f"성능 리포트: {write_report(outd, report)}"))
+                self.q.put(("log","=== 완료 ==="))
+            except Exception as e:
+                self.q.put(("log", f"[ERR] 작업 중단: {type(e).__name__}: {e}"))
+            finally:
+                self.q.put(("enable",None))   # 실패해도 시작 버튼은 다시 켠다
+
+        def remote():
+            try:
+                job = self.client.submit({"pdfs": pdfs, "prefix": prefs, "out": outd,
+                                          "fmt": opts.fmt, "gray": opts.gray,
+                                          "preview": opts.preview, "sink": kind})
+            except (OSError, RuntimeError, ValueError) as e:
+                self.q.put(("log", f"[ERR] 서비스: {e}"))
+                return self.q.put(("enable", None))
+            self.job_id, seen = job["id"], 0
+            self.q.put(("log", f"서비스 작업 {self.job_id}"))
+            while True:
+                try:
+                    st = self.client.status(self.job_id, seen)
+                except (OSError, ValueError) as e:
+                    self.q.put(("log", f"[ERR] 서비스 연결 끊김: {e}"))
+                    break
+                for line in st.get("lines", ()):
+                    self.q.put(("log", line))
+                seen += len(st.get("lines", ()))
+                if st.get("perf"):
+                    self.q.put(("perf", st["perf"]))
+                if st.get("state") in ("done", "failed", "cancelled"):
+                    self.q.put(("log", f"=== {st['state']} ==="))
+                    break
+                time.sleep(POLL_SEC)
+            self.q.put(("enable", None))
+
+        remote_ok = self.client.alive()
+        threading.Thread(target=remote if remote_ok else worker, daemon=True).start()
+
+def run_gui() -> int:
+    missing = []
+    for m,pkg in [("fitz","PyMuPDF"), ("PIL","Pillow")]:
+        try: __import__(m)
+        except ImportError:
+            missing.append(pkg)
+    if missing:
+        print("필요 패키지:", ", ".join(missing))
+        return 1
+    App().mainloop()
+    return 0
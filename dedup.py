@@ -0,0 +1,214 @@
+# 파일명: dedup.py
+"""
+문항 중복 제거 (문서 간 내용 주소 저장소)
+- 렌더 전에 문항 영역 지문 계산: 정규화한 텍스트 + 글꼴 + 블록 상대 위치,
+  그림은 지각 해시(dHash), 벡터 도형은 상대 경로 좌표·색
+  (외곽 크기·선 개수가 같아도 모양이 다른 그래프는 다른 지문)
+- 지문 + 렌더 설정(DPI·형식·흑백·목표 용량·렌더러 버전) + 문항별 렌더 정책(DPI·색 모드)
+  → 저장소 키
+- 같은 키가 이미 인코딩돼 있으면 렌더·인코딩 없이 재사용 (폴더 출력은 하드 링크)
+- 저장소: 캐시 폴더의 blobs/ (sqlite 색인, 최근 사용 순 LRU 삭제)
+"""
+import io
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import unicodedata
+
+from PIL import Image   # pip install pillow
+
+from layout_cache import CACHE_DIR
+
+STORE_DIR  = os.path.join(CACHE_DIR, "blobs")
+MAX_BYTES  = 2 * 1024 * 1024 * 1024
+DHASH_SIZE = 16     # 16×16 비트 — 같은 자리·같은 글 옆의 다른 그림과 헷갈리지 않을 만큼
+GRID       = 0.5    # 상대 좌표 반올림 단위(pt)
+CHROMA     = 4      # 색 지문 격자 (4×4 칸의 r-g, g-b) — 컬러 그림과 흑백 재판을 구분
+CHROMA_Q   = 48     # 색 차이 양자화 단위 (재압축 잡음은 흡수)
+
+def _q(v: float) -> float:
+    return round(v / GRID) * GRID
+
+def _rel(bbox, clip) -> list:
+    return [_q(bbox[0] - clip[0]), _q(bbox[1] - clip[1]),
+            _q(bbox[2] - clip[0]), _q(bbox[3] - clip[1])]
+
+def _hits(bbox, clip) -> bool:
+    return bbox[0] < clip[2] and bbox[2] > clip[0] and bbox[1] < clip[3] and bbox[3] > clip[1]
+
+def _coords(v, clip) -> list:
+    """경로 항목의 점·사각형·사변형 → clip 기준 상대 좌표 (x, y 번갈아)"""
+    flat = []
+    def walk(t):
+        for u in t:
+            if isinstance(u, (tuple, list)):
+                walk(u)
+            else:
+                flat.append(u)
+    walk(v)
+    return [_q(c - clip[i % 2]) for i, c in enumerate(flat)]
+
+def _path(items: list, clip) -> list:
+    """get_cdrawings 항목("l", "re", "c", "qu" …) → [연산, 상대 좌표] 목록"""
+    return [[it[0], *(_coords(u, clip) for u in it[1:] if isinstance(u, (tuple, list)))]
+            for it in items]
+
+def dhash(data: bytes) -> str:
+    """이미지 바이트 → 지각 해시(hex) + 색 지문. 다시 압축된 같은 그림도 같은 값이 되도록.
+    밝기 dHash만으로는 컬러 그림과 그 흑백 재판이 같아지므로 거친 색 차이 격자를 붙인다.
+    PIL이 못 여는 형식이면 원본 바이트 해시.
+    """
+    try:
+        img = Image.open(io.BytesIO(data))
+        img.draft("RGB", (DHASH_SIZE * 4, DHASH_SIZE * 4))   # JPEG는 축소 디코딩
+        img = img.convert("RGB")
+        px = list(img.convert("L").resize((DHASH_SIZE + 1, DHASH_SIZE),
+                                           Image.Resampling.BILINEAR).getdata())
+        rgb = list(img.resize((CHROMA, CHROMA), Image.Resampling.BOX).getdata())
+    except Exception:
+        return hashlib.sha256(data).hexdigest()
+    bits = 0
+    for y in range(DHASH_SIZE):
+        row = px[y * (DHASH_SIZE + 1):(y + 1) * (DHASH_SIZE + 1)]
+        for x in range(DHASH_SIZE):
+            bits = bits << 1 | (row[x] > row[x + 1])
+    chroma = ",".join(f"{round((r - g) / CHROMA_Q)}:{round((g - b) / CHROMA_Q)}"
+                      for r, g, b in rgb)
+    return f"{bits:0{DHASH_SIZE * DHASH_SIZE // 4}x}/{chroma}"
+
+def fingerprint(blocks: list, drawings: list, clip) -> str:
+    """문항 영역(clip)의 지문. blocks는 get_text("dict") 블록, drawings는 get_cdrawings().
+    영역과 겹치는 것만, 좌표는 clip 기준 상대값이라 페이지 위치와 무관하다.
+    """
+    parts = [[_q(clip[2] - clip[0]), _q(clip[3] - clip[1])]]
+    for b in blocks:
+        if not _hits(b["bbox"], clip):
+            continue
+        if b["type"] == 1:
+            parts.append(["img", _rel(b["bbox"], clip), dhash(b.get("image", b""))])
+            continue
+        for line in b["lines"]:
+            for span in line["spans"]:
+                text = " ".join(unicodedata.normalize("NFKC", span["text"]).split())
+                if text:
+                    parts.append(["txt", _rel(span["bbox"], clip), text, span["font"],
+                                  round(span["size"], 1), span["color"]])
+    for d in drawings:
+        rect = d.get("rect")
+        if rect is not None and _hits(rect, clip):
+            parts.append(["draw", _rel(rect, clip), _path(d.get("items", ()), clip),
+                          d.get("fill"), d.get("color"), d.get("width")])
+    return hashlib.sha256(json.dumps(parts, ensure_ascii=False, default=str)
+                          .encode("utf-8")).hexdigest()
+
+class BlobStore:
+    """키 → 인코딩된 문항 바이트. 꺼낼 때 체크섬을 확인해 망가진 항목은 버린다."""
+    def __init__(self, root: str = None, max_bytes: int = MAX_BYTES):
+        self.root = root or STORE_DIR
+        os.makedirs(self.root, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(os.path.join(self.root, "index.sqlite"), timeout=30)
+        # 여러 배치(CLI·서비스)가 같은 저장소를 쓰므로 WAL로 읽기가 쓰기를 막지 않게 하고
+        # 쓰기마다 바로 커밋해 쓰기 잠금을 오래 잡지 않는다
+        self.db.execute("PRAGMA journal_mode=WAL")
+        self.db.execute("PRAGMA synchronous=NORMAL")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS blobs ("
+            " key TEXT PRIMARY KEY, sha256 TEXT, size INTEGER, quality INTEGER, used REAL)"
+        )
+        self.db.commit()
+
+    @staticmethod
+    def key(fp: str, settings: dict) -> str:
+        return hashlib.sha256(json.dumps([fp, settings], sort_keys=True)
+                              .encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.root, key[:2], key)
+
+    def has(self, key: str) -> bool:
+        return self.db.execute("SELECT 1 FROM blobs WHERE key = ?", (key,)).fetchone() is not None
+
+    def get(self, key: str):
+        """→ (bytes, {sha256, bytes, quality}) 또는 None (없거나 체크섬 불일치)"""
+        row = self.db.execute("SELECT sha256, size, quality FROM blobs WHERE key = ?",
+                              (key,)).fetchone()
+        if row is None:
+            return None
+        try:
+            with open(self.path(key), "rb") as f:
+                data = f.read()
+        except OSError:
+            data = None
+        if data is None or hashlib.sha256(data).hexdigest() != row[0]:
+            self._drop(key)
+            return None
+        self.db.execute("UPDATE blobs SET used = ? WHERE key = ?", (time.time(), key))
+        self.db.commit()
+        return data, {"sha256": row[0], "bytes": row[1], "quality": row[2]}
+
+    def put(self, key: str, data: bytes, sha256: str, quality: int = None, src: str = None):
+        """src(이미 쓴 출력 파일)가 있으면 하드 링크로 저장해 같은 바이트를 두 번 쓰지 않는다."""
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        if os.path.lexists(path):
+            os.remove(path)
+        try:
+            if src is None:
+                raise OSError
+            os.link(src, path)
+        except OSError:   # 다른 드라이브·링크 미지원
+            with open(path, "wb") as f:
+                f.write(data)
+        self.db.execute("INSERT OR REPLACE INTO blobs VALUES (?, ?, ?, ?, ?)",
+                        (key, sha256, len(data), quality, time.time()))
+        self.db.commit()
+
+    def link(self, key: str, dst: str) -> bool:
+        """저장소의 바이트를 dst에 하드 링크 → 실패하면 False (호출 측이 바이트를 씀)"""
+        try:
+            if os.path.lexists(dst):
+                os.remove(dst)
+            os.link(self.path(key), dst)
+            return True
+        except OSError:
+            return False
+
+    def _drop(self, key: str) -> None:
+        self.db.execute("DELETE FROM blobs WHERE key = ?", (key,))
+        try:
+            os.remove(self.path(key))
+        except OSError:
+            pass
+        self.db.commit()
+
+    def evict(self) -> int:
+        """총 용량이 max_bytes를 넘으면 오래 안 쓴 항목부터 지움 → 지운 개수"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        removed = 0
+        if total > self.max_bytes:
+            for key, size in self.db.execute("SELECT key, size FROM blobs ORDER BY used").fetchall():
+                if total <= self.max_bytes * 0.9:
+                    break
+                self._drop(key)
+                total -= size
+                removed += 1
+        self.db.commit()
+        return removed
+
+    def clear(self) -> None:
+        for (key,) in self.db.execute("SELECT key FROM blobs").fetchall():
+            self._drop(key)
+        self.db.commit()
+
+    def close(self) -> None:
+        self.evict()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
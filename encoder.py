@@ -0,0 +1,57 @@
+# 파일명: encoder.py
+"""
+문항 이미지 인코더 (cut_questions / extract_questions 공용)
+- 메모리상의 이미지를 목표 용량 안으로 인코딩 → 파일 쓰기는 1회
+- JPEG/WebP: 품질을 이진 탐색 (기존 5단계씩 최대 18회 재인코딩 대체)
+- 흑백 옵션: 흰 바탕 검은 글씨 문항은 L 모드로 용량·인코딩 시간 절감
+- PNG 압축 레벨 선택: 인코딩 시간과 용량 중 어느 쪽을 줄일지 (기본은 PIL 기본값)
+- 1비트(모드 "1") 이미지는 PNG면 그대로, JPEG/WebP는 지원하지 않아 L로 저장
+"""
+import io
+
+from PIL import Image   # pip install pillow
+
+TARGET_KB   = 500
+MAX_QUALITY = 95
+MIN_QUALITY = 10
+FORMATS     = {"png": "PNG", "jpg": "JPEG", "webp": "WEBP"}
+PNG_LEVEL   = 6    # PNG zlib 레벨: 1 인코딩이 빠르고 ~35% 큼, 9 optimize와 같은 크기지만 ~3배 느림
+
+def _save(img: Image.Image, fmt: str, **params) -> bytes:
+    buf = io.BytesIO()
+    img.save(buf, FORMATS[fmt], **params)
+    return buf.getvalue()
+
+def encode_image(img: Image.Image, fmt: str, target_kb: int = TARGET_KB,
+                 gray: bool = False, png_level: int = PNG_LEVEL) -> tuple:
+    """이미지를 fmt로 인코딩 → (bytes, 선택한 품질).
+    JPEG/WebP는 target_kb 이하가 되는 가장 높은 품질을 이진 탐색으로 찾는다.
+    최저 품질로도 넘치면 최저 품질 결과를 돌려준다. PNG는 무손실이라 품질은 None이고
+    png_level(0~9)로 압축 레벨을 정한다.
+    """
+    if img.mode == "1" and fmt != "png":
+        img = img.convert("L")
+    if gray and img.mode not in ("L", "1"):
+        img = img.convert("L")
+    elif img.mode not in ("RGB", "L", "1"):
+        img = img.convert("RGB")
+
+    if fmt == "png":
+        return _save(img, fmt, compress_level=png_level), None
+
+    limit = target_kb * 1024
+    data = _save(img, fmt, quality=MAX_QUALITY)
+    if len(data) <= limit:
+        return data, MAX_QUALITY
+
+    lo, hi = MIN_QUALITY, MAX_QUALITY - 1
+    best = None
+    while lo <= hi:
+        q = (lo + hi) // 2
+        data = _save(img, fmt, quality=q)
+        if len(data) <= limit:
+            best = (data, q)
+            lo = q + 1
+        else:
+            hi = q - 1
+    return best or (data, MIN_QUALITY)
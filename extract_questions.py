@@ -3,125 +3,560 @@
 import os
 import re
 import sys
-import tempfile
+import queue
+import time
 import threading
+import multiprocessing
 from pathlib import Path
-from pdf2image import convert_from_path
-import pytesseract
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+import fitz      # pip install pymupdf
 from PIL import Image
-import PySimpleGUI as sg
+# pdf2image · pytesseract · PySimpleGUI는 쓰는 곳에서 import — service.py가 가볍게 뜨도록
+try:
+    import tesserocr   # pip install tesserocr (선택) — 모델을 워커 프로세스에 상주시킴
+except ImportError:
+    tesserocr = None
+
+from encoder import FORMATS, MAX_QUALITY, encode_image
+from layout_cache import LayoutCache, file_hash
+from perf import Stats, build_report, write_report
+from sinks import KINDS, FolderSink, open_sink
+
+DPI      = 300
+DETECTOR = "extract_questions/3"   # 검출 로직이 바뀌면 올려서 레이아웃 캐시 무효화
 
 # ----------------------------------------
-# 유틸: 이미지 용량 500kb 이하로 자동 압축
-def compress_image(file_path: str, target_size_kb=500):
-    """JPEG로 재저장하면서 품질을 낮춰 500KB 이하로 압축."""
-    img = Image.open(file_path)
-    quality = 95
-    while True:
-        buf = tempfile.SpooledTemporaryFile()
-        img.save(buf, format='JPEG', quality=quality)
-        size = buf.tell() / 1024
-        if size <= target_size_kb or quality <= 20:
-            buf.seek(0)
-            with open(file_path, 'wb') as f:
-                f.write(buf.read())
-            break
-        quality -= 5
+# 페이지 스트리밍: 한 번에 한 장씩 렌더 (전체 PDF를 메모리에 올리지 않음)
+def iter_pages(pdf_path: str, dpi: int = DPI, prefetch: int = 1):
+    """(페이지 번호, PIL 이미지)를 차례로 내주는 생성기.
+    백그라운드 스레드가 다음 페이지를 미리 렌더해 OCR·크롭과 겹치게 하고,
+    큐 크기(prefetch)만큼만 미리 올려 두므로 메모리는 페이지 수와 무관하다.
+    """
+    from pdf2image import convert_from_path, pdfinfo_from_path
+
+    n_pages = pdfinfo_from_path(pdf_path)["Pages"]
+    q = queue.Queue(maxsize=prefetch)
+    stop = threading.Event()
+
+    def render():
+        try:
+            for i in range(1, n_pages + 1):
+                if stop.is_set():
+                    return
+                img = convert_from_path(pdf_path, dpi=dpi, first_page=i, last_page=i)[0]
+                q.put((i, img))
+        except Exception as e:
+            q.put(e)
+            return
+        q.put(None)
+
+    t = threading.Thread(target=render, daemon=True)
+    t.start()
+    try:
+        while True:
+            item = q.get()
+            if item is None:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        # 소비가 중간에 끝나면 렌더 스레드가 put()에서 멈추지 않게 비워 준다
+        stop.set()
+        while t.is_alive():
+            try:
+                q.get(timeout=0.1)
+            except queue.Empty:
+                pass
+
+# ----------------------------------------
+# 문항 번호 검출: 텍스트 레이어 우선, 없으면 Tesseract OCR
+RE_QNUM        = re.compile(r'^\d+\.$')   # “숫자.” 형태의 문항 번호
+MIN_TEXT_CHARS = 20                        # 이보다 글자가 적으면 스캔 페이지로 간주
+PATH_LABEL     = {"text": "텍스트 레이어", "roi": "여백 OCR", "ocr": "OCR"}
+
+# 스캔 페이지: 각 단 왼쪽 여백 띠만 저해상도·숫자 전용으로 OCR
+ROI_DPI    = 100                          # 여백 띠 OCR 해상도
+ROI_WIDTH  = 0.12                         # 단 폭 대비 여백 띠 폭
+ROI_CONF   = 60                           # 이 신뢰도 미만 인식 결과는 버림
+ROI_PSM    = 11                           # 흩어진 텍스트(sparse text) 모드
+ROI_CHARS  = '0123456789.'
+ROI_INK    = 128                          # 이보다 어두우면 잉크
+ROI_INKMIN = 0.005                        # 세로줄 중 잉크 비율이 이 이상이면 내용 시작
+ROI_PAD    = 4                            # 잉크 시작점 왼쪽 여유(축소 px)
+
+# 단 수 자동 판별 (columns=0): 가운데쯤의 잉크 없는 세로 띠 = 단 사이
+AUTO        = 0
+MAX_COLUMNS = 3
+COL_BINS    = 400                         # 세로 투영 칸 수 (글자 사이 틈은 뭉개지도록)
+COL_FILL    = 0.05                        # 양쪽 중 성긴 쪽 잉크 최댓값의 이 비율 이하면 빈 칸
+COL_GAP     = 0.02                        # 단 사이 빈 띠 최소 폭 (페이지 폭 대비)
+COL_MIN     = 0.2                         # 단 최소 폭 — 이보다 가까운 빈 띠는 넓은 쪽만
+
+def text_layer_marks(fpage, dpi: int):
+    """fitz 페이지의 텍스트 레이어에서 문항 번호 위치(px) 검출.
+    쓸 만한 텍스트가 없으면(스캔·이미지 전용 페이지) None, 글자는 있는데 번호가 없으면 [].
+    """
+    words = fpage.get_text("words")   # (x0, y0, x1, y1, word, block, line, wno)
+    if sum(len(w[4].strip()) for w in words) < MIN_TEXT_CHARS:
+        return None
+    scale = dpi / 72
+    marks = [
+        {"num": w[4].strip().rstrip('.'), "left": w[0] * scale,
+         "top": w[1] * scale, "height": (w[3] - w[1]) * scale}
+        for w in words if RE_QNUM.match(w[4].strip())
+    ]
+    marks.sort(key=lambda m: m["top"])
+    return marks
+
+def ocr_marks(page_img: Image.Image) -> list:
+    """페이지 전체 OCR (한글+영문)로 문항 번호 위치 검출"""
+    data = ocr_data(page_img, 'kor+eng')
+    return [
+        {"num": txt.strip().rstrip('.'), "left": data['left'][i],
+         "top": data['top'][i], "height": data['height'][i]}
+        for i, txt in enumerate(data['text'])
+        if RE_QNUM.match(txt.strip())
+    ]
+
+def _ink_proj(img: Image.Image, width: int = None) -> list:
+    """x별 잉크 비율(0~255) — 세로 투영. width를 주면 그 칸 수로 평균."""
+    dark = img.convert("L").point(lambda v: 255 if v < ROI_INK else 0)
+    return list(dark.resize((width or img.width, 1), Image.Resampling.BOX).getdata())
+
+def count_columns(img: Image.Image) -> int:
+    """세로 투영에서 가운데(15~85%)의 빈 띠로 단 수를 정한다 (최대 MAX_COLUMNS).
+    빈 칸 기준은 양쪽 중 성긴 단의 최댓값 대비라 머리말·두 단에 걸친 지문 줄이 지나가도 찾는다.
+    가장 넓은 띠의 절반 이상인 것만, 서로 COL_MIN 이상 떨어진 것만 단 경계로 센다
+    (번호 뒤 공백처럼 줄마다 같은 자리에 오는 좁은 틈 제외).
+    """
+    proj = _ink_proj(img.reduce(max(1, img.width // (COL_BINS * 2))), COL_BINS)
+    w = len(proj)
+    left, right, acc = [0] * w, [0] * w, 0
+    for x in range(w):
+        acc = left[x] = max(acc, proj[x])
+    acc = 0
+    for x in range(w - 1, -1, -1):
+        acc = right[x] = max(acc, proj[x])
+    bands, start = [], None
+    for x in range(int(w * 0.15), int(w * 0.85) + 1):
+        if proj[x] <= COL_FILL * min(left[x], right[x]):
+            start = x if start is None else start
+            continue
+        if start is not None and x - start >= COL_GAP * w:
+            bands.append((start, x))
+        start = None
+    bands.sort(key=lambda b: b[0] - b[1])   # 넓은 것부터
+    cuts = []
+    for x0, x1 in bands:
+        if (x1 - x0) * 2 >= bands[0][1] - bands[0][0] and \
+                all(abs((x0 + x1) / 2 - c) >= COL_MIN * w for c in cuts):
+            cuts.append((x0 + x1) / 2)
+    return min(MAX_COLUMNS, len(cuts) + 1)
+
+def ink_edges(img: Image.Image, columns: int = 1) -> list:
+    """단마다 잉크가 처음 나오는 x (세로 투영). 빈 단은 단 시작 x."""
+    proj = _ink_proj(img)
+    col_w = img.width / columns
+    edges = []
+    for c in range(columns):
+        lo, hi = int(c * col_w), int((c + 1) * col_w)
+        edges.append(next((x for x in range(lo, hi) if proj[x] >= 255 * ROI_INKMIN), lo))
+    return edges
+
+def roi_ocr_marks(page_img: Image.Image, columns: int = 1, dpi: int = DPI) -> list:
+    """단마다 잉크가 시작되는 곳부터 여백 띠만 ROI_DPI로 줄여 숫자·마침표만 OCR.
+    → 단별 문항 번호 목록. 좌표는 원본(dpi) 해상도로 되돌려 돌려준다.
+    """
+    factor = max(1, round(dpi / ROI_DPI))
+    small = page_img.reduce(factor)
+    col_w = small.width / columns
+    per_col = []
+    for edge in ink_edges(small, columns):
+        x0 = max(0, edge - ROI_PAD)
+        strip = small.crop((x0, 0, x0 + max(1, int(col_w * ROI_WIDTH)), small.height))
+        data = ocr_data(strip, 'eng', ROI_PSM, ROI_CHARS)
+        per_col.append([
+            {"num": txt.strip().rstrip('.'), "left": (x0 + data['left'][i]) * factor,
+             "top": data['top'][i] * factor, "height": data['height'][i] * factor}
+            for i, txt in enumerate(data['text'])
+            if RE_QNUM.match(txt.strip()) and float(data['conf'][i]) >= ROI_CONF
+        ])
+    return per_col
+
+def scan_marks(page_img: Image.Image, columns: int = 1, dpi: int = DPI) -> tuple:
+    """스캔 페이지: 여백 띠 OCR → 번호를 못 찾은 단만 그 단 전체 OCR. OCR 워커에서 실행된다."""
+    col_w = page_img.width / columns
+    method, marks = "roi", []
+    for c, found in enumerate(roi_ocr_marks(page_img, columns, dpi)):
+        if not found:
+            method = "ocr"
+            x0 = int(c * col_w)
+            col = page_img.crop((x0, 0, int((c + 1) * col_w), page_img.height))
+            found = [{**m, "left": m["left"] + x0} for m in ocr_marks(col)]
+        marks += found
+    return method, marks
+
+def _scan_task(page_img: Image.Image, columns: int, dpi: int) -> tuple:
+    """OCR 워커용 scan_marks → (method, marks, 단계 통계)"""
+    stats = Stats()
+    with stats.time("ocr"):
+        method, marks = scan_marks(page_img, columns, dpi)
+    return method, marks, stats.to_dict()
+
+def detect_questions(fpage, page_img: Image.Image, dpi: int = DPI, columns: int = AUTO) -> tuple:
+    """→ (검출 경로 'text' | 'roi' | 'ocr', 문항 번호 목록, 단 수)
+    텍스트 레이어 → 여백 띠 OCR → 전체 페이지 OCR 순으로 시도한다.
+    텍스트 레이어에 글자만 있고 번호가 없으면(머리말·쪽 번호만 남은 스캔본 등) OCR로 넘어간다.
+    columns가 AUTO(0)면 count_columns로 정한다.
+    """
+    columns = columns or count_columns(page_img)
+    if fpage is not None:
+        marks = text_layer_marks(fpage, dpi)
+        if marks:
+            return "text", marks, columns
+    return (*scan_marks(page_img, columns, dpi), columns)
+
+# ----------------------------------------
+# OCR 워커 풀: 모델을 올려 둔 프로세스를 계속 재사용
+_apis = {}   # 워커 프로세스별 (lang, psm, whitelist) → 로드된 PyTessBaseAPI
+
+def _api(lang: str, psm: int, whitelist: str = None):
+    key = (lang, psm, whitelist)
+    api = _apis.get(key)
+    if api is None:
+        api = _apis[key] = tesserocr.PyTessBaseAPI(lang=lang, psm=psm)
+        if whitelist:
+            api.SetVariable("tessedit_char_whitelist", whitelist)
+    return api
+
+def ocr_data(img: Image.Image, lang: str, psm: int = 3, whitelist: str = None) -> dict:
+    """pytesseract.image_to_data 호환 dict (text/left/top/width/height/conf).
+    tesserocr가 있으면 프로세스에 상주하는 API를 재사용하고,
+    없으면 pytesseract로 tesseract를 실행한다.
+    """
+    if tesserocr is None:
+        import pytesseract
+
+        config = f'--psm {psm}'
+        if whitelist:
+            config += f' -c tessedit_char_whitelist={whitelist}'
+        return pytesseract.image_to_data(img, lang=lang, config=config,
+                                         output_type=pytesseract.Output.DICT)
+
+    api = _api(lang, psm, whitelist)
+    api.SetImage(img)
+    api.Recognize()
+    data = {k: [] for k in ('text', 'left', 'top', 'width', 'height', 'conf')}
+    ri = api.GetIterator()
+    if ri is None:
+        return data
+    level = tesserocr.RIL.WORD
+    for w in tesserocr.iterate_level(ri, level):
+        box = w.BoundingBox(level)
+        if box is None:
+            continue
+        x0, y0, x1, y1 = box
+        data['text'].append(w.GetUTF8Text(level) or '')
+        data['left'].append(x0)
+        data['top'].append(y0)
+        data['width'].append(x1 - x0)
+        data['height'].append(y1 - y0)
+        data['conf'].append(w.Confidence(level))
+    return data
+
+def _warm_worker():
+    """워커 시작 시 모델을 미리 올려 첫 페이지부터 로드 비용이 없게 한다."""
+    if tesserocr is not None:
+        _api('kor+eng', 3)
+        _api('eng', ROI_PSM, ROI_CHARS)
+
+class OcrPool:
+    """OCR 전용 장기 실행 워커 풀.
+    동시에 걸려 있는 작업 수를 max_pending으로 제한해(bounded queue)
+    렌더 속도가 OCR보다 빨라도 페이지 이미지가 무한히 쌓이지 않는다.
+    """
+    def __init__(self, workers: int = None, max_pending: int = None):
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers + 1
+        self._slots = threading.BoundedSemaphore(self.max_pending)
+        self._ex = ProcessPoolExecutor(self.workers, initializer=_warm_worker)
+
+    def submit(self, fn, *args) -> Future:
+        self._slots.acquire()
+        try:
+            fut = self._ex.submit(fn, *args)
+        except BaseException:
+            self._slots.release()
+            raise
+        fut.add_done_callback(lambda _: self._slots.release())
+        return fut
+
+    def alive(self) -> bool:
+        """워커가 죽어 풀이 깨졌으면 False (빈 작업을 넣어만 보고 결과는 기다리지 않음)"""
+        try:
+            self._ex.submit(int)
+        except (BrokenProcessPool, RuntimeError):
+            return False
+        return True
+
+    def close(self):
+        self._ex.shutdown(cancel_futures=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+def _done(value) -> Future:
+    fut = Future()
+    fut.set_result(value)
+    return fut
 
 # ----------------------------------------
-# 핵심: PDF → 페이지 이미지 → OCR 데이터 → 문항별 crop → 저장
-def process_pdf(pdf_path: str, prefix: str, out_folder: str, fmt: str, window: sg.Window):
+# 핵심: PDF → 페이지 이미지 → 문항 번호 검출 → 문항별 crop → 저장
+def process_pdf(pdf_path: str, prefix: str, out_folder: str, fmt: str, window,
+                gray: bool = False, columns: int = AUTO, pool: OcrPool = None,
+                cache: LayoutCache = None, stats: Stats = None, sink: FolderSink = None,
+                cancel: threading.Event = None):
+    """렌더(스레드) → OCR(pool 워커) → crop·저장(이 스레드)을 파이프라인으로 돌린다.
+    OCR 결과는 페이지 순서대로 받아 처리한다. pool이 없으면 이 스레드에서 바로 OCR.
+    cache에 검출 결과가 있는 페이지는 텍스트 추출·OCR 없이 바로 crop한다.
+    stats에는 단계별 시간(render·text·ocr·encode·write)과 개수가 누적된다.
+    인코딩한 문항은 sink(기본: out_folder에 낱개 파일)에 바로 쓴다.
+    cancel이 설정되면 다음 페이지부터 처리하지 않고 돌아온다.
+    columns가 AUTO(0)면 페이지마다 count_columns로 단 수를 정한다.
+    window: 진행 이벤트를 받을 write_event_value(이벤트, 값) 객체 (sg.Window, 서비스의 Job 등)
+    """
+    name = Path(pdf_path).name
+    stats = stats if stats is not None else Stats()
+    sink = sink or FolderSink()
     try:
-        pages = convert_from_path(pdf_path, dpi=300)
+        doc = fitz.open(pdf_path)
+    except Exception:
+        doc = None   # 텍스트 레이어를 못 읽으면 전 페이지 OCR
+    detector = f"{DETECTOR}/{DPI}dpi/{columns or 'auto'}col"
+    key, cached, fresh = None, {}, {}
+    if cache is not None:
+        key = file_hash(pdf_path)
+        cached = cache.get_doc(key, detector)
+    pending = deque()   # (page_idx, page_img, 단 수, Future[(method, marks, 통계 | None)])
+    limit = pool.max_pending if pool is not None else 1
+
+    def finish():
+        page_idx, page_img, cols, fut = pending.popleft()
+        method, marks, ocr_stats = fut.result()
+        if ocr_stats:
+            stats.merge(ocr_stats)
+        stats.add("pages")
+        hit = page_idx - 1 in cached
+        if not hit:
+            fresh[page_idx - 1] = (method, marks, cols)
+        window.write_event_value('-PROGRESS-',
+                                 f"[{name}] p{page_idx} {PATH_LABEL[method]}"
+                                 f"{' 캐시' if hit else ''} ({cols}단, 문항 {len(marks)}개)")
+        save_crops(page_img, marks, prefix, out_folder, fmt, gray, name, window, cols, stats,
+                   sink)
+        page_img.close()   # crop 저장이 끝난 페이지는 바로 해제
+
+    pages = iter_pages(pdf_path, dpi=DPI)
+    try:
+        while True:
+            with stats.time("render"):   # 렌더 스레드를 기다린 시간
+                nxt = next(pages, None)
+            if nxt is None:
+                break
+            if cancel is not None and cancel.is_set():
+                for *_, fut in pending:
+                    fut.cancel()
+                window.write_event_value('-DONE-', f"{name} 취소됨")
+                return
+            page_idx, page_img = nxt
+            if page_idx - 1 in cached:
+                method, marks, cols = cached[page_idx - 1]
+                pending.append((page_idx, page_img, cols, _done((method, marks, None))))
+                while len(pending) >= limit:
+                    finish()
+                continue
+            fpage = doc[page_idx - 1] if doc is not None else None
+            cols = columns or count_columns(page_img)
+            with stats.time("text"):
+                marks = text_layer_marks(fpage, DPI) if fpage is not None else None
+            if marks:
+                fut = _done(("text", marks, None))
+            else:
+                if marks is not None:
+                    # 글자는 있는데 번호가 없음 — 번호가 그림으로 들어간 페이지일 수 있어 OCR로
+                    window.write_event_value('-PROGRESS-',
+                                             f"[{name}] p{page_idx} 텍스트 레이어에 번호 없음 → OCR")
+                if pool is not None:
+                    # 워커로는 흑백으로 보내 프로세스 간 전송량을 1/3로
+                    fut = pool.submit(_scan_task, page_img.convert("L"), cols, DPI)
+                else:
+                    fut = _done(_scan_task(page_img, cols, DPI))
+            pending.append((page_idx, page_img, cols, fut))
+            while len(pending) >= limit:
+                finish()
+        while pending:
+            finish()
     except Exception as e:
+        for *_, fut in pending:
+            fut.cancel()
         window.write_event_value('-ERROR-', f"{pdf_path} 변환 실패: {e}")
         return
+    finally:
+        pages.close()   # 중간에 끝나도 렌더 스레드를 바로 멈춤
+        if doc is not None:
+            doc.close()
+        if cache is not None and fresh:
+            cache.put_doc(key, detector, fresh)
+    window.write_event_value('-DONE-', f"{name} 처리 완료")
+
+def crop_boxes(marks: list, width: int, height: int, columns: int = 1) -> list:
+    """문항 번호 위치 → 문항별 crop 영역 [(mark, (x0, y0, x1, y1)), ...] (단 순, 위→아래)
+    각 문항은 번호 위부터 같은 단 다음 문항 번호 줄 아래까지.
+    """
+    # 단별로 나눠 위→아래 순서로 정렬
+    col_w = width / columns
+    by_col = [[] for _ in range(columns)]
+    for mark in marks:
+        by_col[min(columns - 1, int(mark['left'] // col_w))].append(mark)
 
-    for page_idx, page_img in enumerate(pages, start=1):
-        # 페이지 전체 OCR (한글+영문)
-        data = pytesseract.image_to_data(
-            page_img, lang='kor+eng',
-            output_type=pytesseract.Output.DICT
-        )
-        # “숫자.” 형태를 문항번호로 인식
-        q_indexes = [
-            i for i, txt in enumerate(data['text'])
-            if re.match(r'^\d+\.$', txt.strip())
-        ]
-        # 다음 문항까지 영역을 crop
-        for idx, q_i in enumerate(q_indexes):
-            num = data['text'][q_i].rstrip('.')
-            y1 = max(data['top'][q_i] - 10, 0)
+    boxes = []
+    for c, col_marks in enumerate(by_col):
+        col_marks.sort(key=lambda m: m['top'])
+        x0, x1 = int(c * col_w), int((c + 1) * col_w)
+        for idx, mark in enumerate(col_marks):
+            y1 = max(int(mark['top']) - 10, 0)
             y2 = (
-                data['top'][q_indexes[idx+1]] + data['height'][q_indexes[idx+1]] + 10
-                if idx+1 < len(q_indexes)
-                else page_img.height
+                int(col_marks[idx+1]['top'] + col_marks[idx+1]['height']) + 10
+                if idx+1 < len(col_marks)
+                else height
             )
-            cropped = page_img.crop((0, y1, page_img.width, y2))
-            # 파일명: {prefix}-{문항번호(2자리)}.png 또는 .jpg
-            num_str = num.zfill(2)
-            out_name = f"{prefix}-{num_str}.{fmt}"
-            out_path = os.path.join(out_folder, out_name)
-            cropped.save(out_path, fmt.upper())
-            # 용량 체크 및 압축
-            if os.path.getsize(out_path) > 500 * 1024:
-                compress_image(out_path)
-            window.write_event_value('-PROGRESS-',
-                                     f"[{pdf_path.name}] {out_name} 생성 완료")
-    window.write_event_value('-DONE-', f"{pdf_path.name} 처리 완료")
+            boxes.append((mark, (x0, y1, x1, y2)))
+    return boxes
 
-# ----------------------------------------
-# GUI 레이아웃 정의
-sg.theme('SystemDefault')
-layout = [
-    [sg.Text('1) PDF 파일 선택'), sg.Input(key='-PDFS-'), sg.FilesBrowse(file_types=(("PDF","*.pdf"),))],
-    [sg.Text('2) 파일별 접두어 (콤마 또는 줄바꿈으로 구분)'), sg.Multiline(size=(40,3), key='-PREFIX-')],
-    [sg.Text('3) 출력 폴더 선택'), sg.Input(key='-OUT-'), sg.FolderBrowse()],
-    [sg.Text('4) 이미지 형식'), sg.Combo(['png','jpg'], default_value='png', key='-FMT-')],
-    [sg.Button('시작'), sg.Button('종료')],
-    [sg.Multiline(size=(80,10), key='-LOG-', autoscroll=True, disabled=True)]
-]
-window = sg.Window('문제 이미지 추출 프로그램', layout)
+def save_crops(page_img: Image.Image, marks: list, prefix: str, out_folder: str, fmt: str,
+               gray: bool, name: str, window, columns: int = 1, stats: Stats = None,
+               sink: FolderSink = None):
+    """crop_boxes 영역대로 잘라 인코딩해 sink에 쓴다. window: process_pdf와 같음"""
+    stats = stats if stats is not None else Stats()
+    sink = sink or FolderSink()
+    # 다음 문항까지 영역을 crop
+    for mark, box in crop_boxes(marks, page_img.width, page_img.height, columns):
+        cropped = page_img.crop(box)
+        # 파일명: {prefix}-{문항번호(2자리)}.png / .jpg / .webp
+        num_str = mark['num'].zfill(2)
+        out_name = f"{prefix}-{num_str}.{fmt}"
+        # 500KB 이하가 되는 품질로 한 번에 인코딩·저장
+        with stats.time("encode"):
+            data, quality = encode_image(cropped, fmt, gray=gray)
+        with stats.time("write"):
+            sink.write(out_folder, out_name, data)
+        recompressed = quality is not None and quality < MAX_QUALITY
+        stats.add("crops")
+        stats.add("pixels", cropped.width * cropped.height)
+        stats.add("bytes", len(data))
+        stats.add("recompressed", recompressed)
+        note = f" (q={quality})" if recompressed else ""
+        window.write_event_value('-PROGRESS-',
+                                 f"[{name}] {out_name} 생성 완료{note}")
 
 # ----------------------------------------
-# 이벤트 루프
-while True:
-    event, values = window.read()
-    if event in (sg.WIN_CLOSED, '종료'):
-        break
-    if event == '시작':
-        pdf_paths = [Path(p) for p in values['-PDFS-'].split(';') if p]
-        prefixes = re.split(r'[,\n]+', values['-PREFIX-'].strip())
-        out_folder = values['-OUT-']
-        fmt = values['-FMT-']
-
-        if not pdf_paths:
-            sg.popup_error('PDF 파일을 하나 이상 선택하세요.')
-            continue
-        if len(prefixes) not in (1, len(pdf_paths)):
-            sg.popup_error('접두어는 1개 또는 PDF 파일 수와 동일해야 합니다.')
-            continue
-        # output 폴더 생성
-        os.makedirs(out_folder, exist_ok=True)
-
-        # 백그라운드 스레드에서 처리
-        def worker():
-            for i, pdf in enumerate(pdf_paths):
-                pre = prefixes[i] if len(prefixes)>1 else prefixes[0]
-                process_pdf(str(pdf), pre, out_folder, fmt, window)
-            window.write_event_value('-ALL_DONE-', '모든 작업이 완료되었습니다.')
-
-        threading.Thread(target=worker, daemon=True).start()
-
-    # 백그라운드 로그 수신
-    if event == '-PROGRESS-':
-        window['-LOG-'].print(values[event])
-    if event == '-ERROR-':
-        window['-LOG-'].print('ERROR: '+values[event])
-    if event == '-DONE-':
-        window['-LOG-'].print(values[event])
-    if event == '-ALL_DONE-':
-        window['-LOG-'].print(values[event])
-        sg.popup('완료', '모든 PDF 처리 완료!')
-
-window.close()
+# GUI (워커 프로세스가 이 모듈을 import 해도 창이 뜨지 않도록 main()으로 감쌈)
+def main():
+    import PySimpleGUI as sg
+
+    sg.theme('SystemDefault')
+    layout = [
+        [sg.Text('1) PDF 파일 선택'), sg.Input(key='-PDFS-'), sg.FilesBrowse(file_types=(("PDF","*.pdf"),))],
+        [sg.Text('2) 파일별 접두어 (콤마 또는 줄바꿈으로 구분)'), sg.Multiline(size=(40,3), key='-PREFIX-')],
+        [sg.Text('3) 출력 폴더 선택'), sg.Input(key='-OUT-'), sg.FolderBrowse()],
+        [sg.Text('4) 이미지 형식'), sg.Combo(list(FORMATS), default_value='png', key='-FMT-'),
+         sg.Checkbox('흑백', key='-GRAY-'),
+         sg.Text('단 수'), sg.Combo(['자동', 1, 2, 3], default_value='자동', key='-COLS-',
+                                 readonly=True),
+         sg.Text('저장 방식'), sg.Combo(list(KINDS), default_value='folder', key='-SINK-',
+                                    readonly=True)],
+        [sg.Button('시작'), sg.Button('종료'), sg.Button('캐시 비우기')],
+        [sg.Multiline(size=(80,10), key='-LOG-', autoscroll=True, disabled=True)]
+    ]
+    window = sg.Window('문제 이미지 추출 프로그램', layout)
+    pool = OcrPool()   # 창이 열려 있는 동안 OCR 워커(모델 로드 상태)를 재사용
+
+    # ----------------------------------------
+    # 이벤트 루프
+    while True:
+        event, values = window.read()
+        if event in (sg.WIN_CLOSED, '종료'):
+            break
+        if event == '캐시 비우기':
+            with LayoutCache() as cache:
+                cache.clear()
+            window['-LOG-'].print('레이아웃 캐시를 비웠습니다.')
+        if event == '시작':
+            pdf_paths = [Path(p) for p in values['-PDFS-'].split(';') if p]
+            prefixes = re.split(r'[,\n]+', values['-PREFIX-'].strip())
+            out_folder = values['-OUT-']
+            fmt = values['-FMT-']
+            gray = values['-GRAY-']
+            columns = AUTO if values['-COLS-'] == '자동' else int(values['-COLS-'])
+            kind = values['-SINK-']
+
+            if not pdf_paths:
+                sg.popup_error('PDF 파일을 하나 이상 선택하세요.')
+                continue
+            if len(prefixes) not in (1, len(pdf_paths)):
+                sg.popup_error('접두어는 1개 또는 PDF 파일 수와 동일해야 합니다.')
+                continue
+            # output 폴더 생성
+            os.makedirs(out_folder, exist_ok=True)
+
+            # 백그라운드 스레드에서 처리
+            def worker():
+                stats, pdfs = Stats(), {}
+                t0 = time.perf_counter()
+                archive = os.path.join(out_folder,
+                                       time.strftime(f"questions-%Y%m%d-%H%M%S.{kind}"))
+                with LayoutCache() as cache, open_sink(kind, archive, root=out_folder) as sink:
+                    for i, pdf in enumerate(pdf_paths):
+                        pre = prefixes[i] if len(prefixes)>1 else prefixes[0]
+                        pdf_stats = Stats()
+                        process_pdf(str(pdf), pre, out_folder, fmt, window, gray, columns,
+                                    pool, cache, pdf_stats, sink)
+                        stats.merge(pdf_stats.to_dict())
+                        pdfs[pdf.name] = pdf_stats
+                        window.write_event_value('-PROGRESS-',
+                                                 stats.summary(time.perf_counter() - t0))
+                wall = time.perf_counter() - t0
+                if kind != 'folder':
+                    window.write_event_value('-PROGRESS-', f"묶음 파일: {archive}")
+                report = build_report(stats, wall, pdfs, workers=pool.workers, sink=kind,
+                                      options={"dpi": DPI, "fmt": fmt, "gray": gray,
+                                               "columns": columns})
+                window.write_event_value('-PROGRESS-',
+                                         f"성능 리포트: {write_report(out_folder, report)}")
+                window.write_event_value('-ALL_DONE-', '모든 작업이 완료되었습니다.')
+
+            threading.Thread(target=worker, daemon=True).start()
+
+        # 백그라운드 로그 수신
+        if event == '-PROGRESS-':
+            window['-LOG-'].print(values[event])
+        if event == '-ERROR-':
+            window['-LOG-'].print('ERROR: '+values[event])
+        if event == '-DONE-':
+            window['-LOG-'].print(values[event])
+        if event == '-ALL_DONE-':
+            window['-LOG-'].print(values[event])
+            sg.popup('완료', '모든 PDF 처리 완료!')
+
+    pool.close()
+    window.close()
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    main()
@@ -0,0 +1,98 @@
+# 파일명: layout_cache.py
+"""
+페이지 레이아웃 캐시 (cut_questions / extract_questions 공용)
+- 키 : PDF 내용 해시 + 페이지 번호 + 검출기 이름·버전
+- 값 : 그 페이지에서 검출한 문항 영역 (JSON)
+- 같은 PDF를 형식·접두어만 바꿔 다시 돌릴 때 텍스트 추출·번호 검출·OCR 생략
+- 용량 제한 : 최근에 쓴 순서(LRU)로 오래된 항목부터 삭제
+"""
+import os
+import json
+import time
+import sqlite3
+import hashlib
+
+CACHE_DIR = os.environ.get(
+    "CUT_QUESTIONS_CACHE",
+    os.path.join(os.path.expanduser("~"), ".cache", "cut_questions"),
+)
+MAX_BYTES = 64 * 1024 * 1024
+
+def file_hash(path: str) -> str:
+    """PDF 내용 해시 (sha256). 파일명이 바뀌어도 같은 내용이면 같은 키."""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class LayoutCache:
+    def __init__(self, path: str = None, max_bytes: int = MAX_BYTES):
+        if path is None:
+            os.makedirs(CACHE_DIR, exist_ok=True)
+            path = os.path.join(CACHE_DIR, "layout.sqlite")
+        self.max_bytes = max_bytes
+        self.db = sqlite3.connect(path)
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS pages ("
+            " doc TEXT, page INTEGER, detector TEXT,"
+            " data TEXT, size INTEGER, used REAL,"
+            " PRIMARY KEY (doc, page, detector))"
+        )
+        self.db.commit()
+
+    def get_doc(self, doc: str, detector: str) -> dict:
+        """한 PDF의 캐시된 페이지 전부 → {page: data}"""
+        rows = self.db.execute(
+            "SELECT page, data FROM pages WHERE doc = ? AND detector = ?", (doc, detector)
+        ).fetchall()
+        if rows:
+            self.db.execute(
+                "UPDATE pages SET used = ? WHERE doc = ? AND detector = ?",
+                (time.time(), doc, detector),
+            )
+            self.db.commit()
+        return {page: json.loads(data) for page, data in rows}
+
+    def put_doc(self, doc: str, detector: str, pages: dict) -> None:
+        """{page: data} 를 한 트랜잭션으로 저장"""
+        now = time.time()
+        rows = []
+        for page, value in pages.items():
+            data = json.dumps(value, ensure_ascii=False)
+            rows.append((doc, page, detector, data, len(data), now))
+        self.db.executemany("INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?, ?)", rows)
+        self.db.commit()
+
+    def evict(self) -> int:
+        """총 용량이 max_bytes를 넘으면 오래 안 쓴 항목부터 지움 → 지운 행 수"""
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM pages").fetchone()[0]
+        removed = 0
+        if total <= self.max_bytes:
+            return removed
+        for rowid, size in self.db.execute(
+            "SELECT rowid, size FROM pages ORDER BY used"
+        ).fetchall():
+            if total <= self.max_bytes * 0.9:
+                break
+            self.db.execute("DELETE FROM pages WHERE rowid = ?", (rowid,))
+            total -= size
+            removed += 1
+        self.db.commit()
+        return removed
+
+    def clear(self) -> None:
+        """캐시 전체 무효화"""
+        self.db.execute("DELETE FROM pages")
+        self.db.commit()
+        self.db.execute("VACUUM")
+
+    def close(self) -> None:
+        self.evict()
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,65 @@
+# 파일명: manifest.py
+"""
+출력 매니페스트 (출력 폴더의 .manifest.jsonl, 문항 이미지 1개당 1줄)
+- 원본 해시 · 페이지 · 문항 번호 · clip · DPI · 형식 · 출력 체크섬 기록
+- 다음 실행에서 입력·설정이 같고 파일이 체크섬과 일치하면 렌더를 건너뜀
+- 한 줄씩 append + flush 하므로 중간에 죽어도 그때까지 만든 문항은 다시 만들지 않음
+"""
+import os
+import json
+import hashlib
+
+MANIFEST = ".manifest.jsonl"
+
+def sha256_bytes(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+def sha256_file(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class Manifest:
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.path = os.path.join(folder, MANIFEST)
+        self.records = {}   # 파일명 → 마지막 기록
+        self._lines = 0
+        if os.path.exists(self.path):
+            with open(self.path, encoding="utf-8") as f:
+                for line in f:
+                    try:
+                        rec = json.loads(line)
+                    except ValueError:
+                        continue   # 기록 도중 끊긴 마지막 줄
+                    self.records[rec["file"]] = rec
+                    self._lines += 1
+        self._f = open(self.path, "a", encoding="utf-8")
+
+    def is_current(self, inputs: dict) -> bool:
+        """입력·설정(inputs)이 지난 기록과 같고 디스크의 파일이 체크섬과 일치하는가"""
+        old = self.records.get(inputs["file"])
+        if old is None or any(old.get(k) != v for k, v in inputs.items()):
+            return False
+        try:
+            return sha256_file(os.path.join(self.folder, inputs["file"])) == old["sha256"]
+        except OSError:
+            return False
+
+    def add(self, record: dict) -> None:
+        self._f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        self._f.flush()
+        self.records[record["file"]] = record
+        self._lines += 1
+
+    def close(self) -> None:
+        """덮어쓴 기록이 많이 쌓였으면 최신 기록만 남기도록 다시 쓴다."""
+        self._f.close()
+        if self._lines > 2 * len(self.records):
+            tmp = self.path + ".tmp"
+            with open(tmp, "w", encoding="utf-8") as f:
+                for rec in self.records.values():
+                    f.write(json.dumps(rec, ensure_ascii=False) + "\n")
+            os.replace(tmp, self.path)
@@ -0,0 +1,87 @@
+# 파일명: perf.py
+"""
+단계별 시간 측정과 성능 리포트 (cut_questions / extract_questions 공용)
+- 단계: text(텍스트 추출) · detect(문항 검출) · ocr · render · encode · write · thumb
+- 카운터: pages · crops · pixels · bytes · recompressed(목표 용량 때문에 품질을 낮춘 문항)
+- 워커 프로세스는 Stats.to_dict()로 돌려주고 부모가 merge()로 합친다
+- 배치마다 JSON 리포트, 필요하면 cProfile / tracemalloc 결과도 함께
+"""
+import os
+import json
+import time
+import cProfile
+import tracemalloc
+from collections import defaultdict
+from contextlib import contextmanager
+
+class Stats:
+    def __init__(self):
+        self.seconds = defaultdict(float)
+        self.counts = defaultdict(int)
+
+    @contextmanager
+    def time(self, stage: str):
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds[stage] += time.perf_counter() - t0
+
+    def add(self, name: str, n: int = 1) -> None:
+        self.counts[name] += n
+
+    def merge(self, other: dict) -> None:
+        for k, v in other["seconds"].items():
+            self.seconds[k] += v
+        for k, v in other["counts"].items():
+            self.counts[k] += v
+
+    def to_dict(self) -> dict:
+        return {"seconds": {k: round(v, 4) for k, v in self.seconds.items()},
+                "counts": dict(self.counts)}
+
+    def rates(self, wall: float) -> dict:
+        wall = max(wall, 1e-9)
+        return {"pages_per_sec": round(self.counts["pages"] / wall, 2),
+                "crops_per_sec": round(self.counts["crops"] / wall, 2)}
+
+    def summary(self, wall: float) -> str:
+        r = self.rates(wall)
+        return (f"{self.counts['pages']}쪽 · {self.counts['crops']}문항 · {wall:.1f}초 "
+                f"({r['pages_per_sec']} pages/s, {r['crops_per_sec']} crops/s)")
+
+def build_report(stats: Stats, wall: float, pdfs: dict = None, **extra) -> dict:
+    """pdfs: {파일명: Stats} — PDF별 단계 시간으로 느린 PDF를 찾을 수 있게"""
+    report = {"finished": time.strftime("%Y-%m-%dT%H:%M:%S"),
+              "wall_seconds": round(wall, 3), **stats.rates(wall), **stats.to_dict(), **extra}
+    if pdfs:
+        report["pdfs"] = {name: s.to_dict() for name, s in pdfs.items()}
+    return report
+
+def write_report(folder: str, report: dict) -> str:
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, time.strftime("perf-%Y%m%d-%H%M%S.json"))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return path
+
+@contextmanager
+def profiled(profile_path: str = None, trace_memory: bool = False):
+    """선택적 프로파일링. yield한 dict에 tracemalloc 최대 사용량이 채워진다.
+    (워커 프로세스가 아니라 이 프로세스만 측정 — 전체를 보려면 --jobs 1)
+    """
+    result = {}
+    prof = cProfile.Profile() if profile_path else None
+    if trace_memory:
+        tracemalloc.start()
+    if prof:
+        prof.enable()
+    try:
+        yield result
+    finally:
+        if prof:
+            prof.disable()
+            prof.dump_stats(profile_path)
+        if trace_memory:
+            result["tracemalloc_peak_bytes"] = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
@@ -0,0 +1,509 @@
+# 파일명: service.py
+"""
+문항 자르기 상주 서비스 (GUI 없이 실행)
+- 워커 프로세스 풀을 한 번 띄워 두고(fitz 로드 상태) 작업마다 재사용
+- 작업 입력 ① 받은 편지함 폴더: PDF를 넣으면 처리 후 done/ · failed/ 로 옮김
+           ② localhost HTTP
+    POST   /jobs                 {"pdfs": [...], "out": "...", "prefix": [...], "fmt", "gray",
+                                  "target_kb", "color", "preview", "sink",
+                                  "tool": "cut" | "extract", "columns": 0(자동) ~ 3}
+    GET    /jobs                 작업 목록
+    GET    /jobs/<id>?since=N    상태 + N번째 이후 로그
+    DELETE /jobs/<id>            취소 (대기 중이면 바로, 실행 중이면 다음 페이지에서)
+    GET    /health               {"ok": 워커 풀이 살아 있는가, "restarts": 풀 재시작 횟수, ...}
+- 워커가 죽어 풀이 깨지면(BrokenProcessPool) 그 작업은 실패로 끝내고 풀을 새로 띄움
+- POST는 Content-Type: application/json만 받고, Origin 헤더가 있는(브라우저에서 온)
+  요청은 거부 — 다른 웹 페이지가 이 컴퓨터의 서비스에 작업을 넣지 못하게
+- 대기열이 차면 HTTP는 503 + Retry-After, 폴더 작업은 자리가 날 때까지 그대로 둠
+- Tk 앱(cut_questions_gui)은 서비스가 떠 있으면 작업을 보내기만 하는 클라이언트
+
+    python service.py --inbox 받은편지함 --outbox 결과 -j 8
+"""
+import os
+import sys
+import json
+import time
+import queue
+import shutil
+import argparse
+import threading
+import multiprocessing
+import urllib.error
+import urllib.request
+from pathlib import Path
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+from cut_questions import COLORS, Options, run_batch
+from dedup import BlobStore
+from encoder import FORMATS, TARGET_KB
+from layout_cache import LayoutCache
+from perf import Stats, build_report, write_report
+from sinks import KINDS, open_sink
+
+PORT      = int(os.environ.get("CUT_QUESTIONS_PORT", 8765))
+QUEUE_MAX = 16     # 대기 작업 수 상한 (넘으면 503)
+KEEP_DONE = 200    # 끝난 작업 기록 보관 개수
+POLL_SEC  = 1.0    # 받은 편지함 확인 간격
+
+# ──────────────────────────────────────
+# 작업
+
+class Job:
+    """작업 하나. put()/write_event_value()가 있어 run_batch의 log,
+    extract_questions의 window 자리에 그대로 넘긴다.
+    """
+    def __init__(self, job_id: str, spec: dict, on_done=None):
+        self.id = job_id
+        self.spec = spec
+        self.state = "queued"   # queued → running → done | failed | cancelled
+        self.lines = []
+        self.perf = ""
+        self.report = None
+        self.error = None
+        self.created = time.time()
+        self.started = self.finished = None
+        self.cancel = threading.Event()
+        self.on_done = on_done
+
+    def put(self, ev: tuple):
+        key, val = ev
+        if key == "log":
+            self.lines.append(val)
+        elif key == "perf":
+            self.perf = val
+
+    def write_event_value(self, key: str, value):
+        if key == "-ERROR-":
+            self.error = str(value)
+            value = f"ERROR: {value}"
+        self.lines.append(str(value))
+
+    def to_dict(self, since: int = None) -> dict:
+        d = {"id": self.id, "state": self.state, "tool": self.spec["tool"],
+             "pdfs": self.spec["pdfs"], "out": self.spec["out"], "perf": self.perf,
+             "created": self.created, "started": self.started, "finished": self.finished,
+             "error": self.error, "lines_total": len(self.lines)}
+        if since is not None:
+            d["lines"] = self.lines[since:]
+            d["report"] = self.report
+        return d
+
+def parse_spec(spec: dict) -> dict:
+    """요청 본문 검사·기본값 채우기 → 정규화한 spec (잘못되면 ValueError)"""
+    if not isinstance(spec, dict):
+        raise ValueError("요청 본문은 JSON 객체")
+    pdfs = spec.get("pdfs")
+    if not pdfs or not isinstance(pdfs, list):
+        raise ValueError("pdfs: PDF 경로 목록이 필요함")
+    missing = [p for p in pdfs if not os.path.isfile(p)]
+    if missing:
+        raise ValueError(f"없는 파일: {', '.join(missing[:3])}")
+    if not spec.get("out"):
+        raise ValueError("out: 출력 폴더가 필요함")
+    prefix = spec.get("prefix") or [Path(p).stem for p in pdfs]
+    if isinstance(prefix, str):
+        prefix = [prefix]
+    if len(prefix) not in (1, len(pdfs)):
+        raise ValueError("prefix: 1개 또는 PDF 수만큼")
+    for pre in prefix:
+        # 접두어는 출력 폴더 아래 하위 폴더 이름 — 경로로 빠져나가지 못하게
+        if (not isinstance(pre, str) or pre in ("", ".", "..")
+                or any(sep in pre for sep in ("/", "\\", os.sep, os.altsep) if sep)):
+            raise ValueError(f"prefix: 경로 구분자 없는 이름이어야 함 ({pre!r})")
+    tool = spec.get("tool", "cut")
+    fmt = spec.get("fmt", "png")
+    sink = spec.get("sink", "folder")
+    if tool not in ("cut", "extract"):
+        raise ValueError("tool: cut 또는 extract")
+    if fmt not in FORMATS:
+        raise ValueError(f"fmt: {', '.join(FORMATS)}")
+    if sink not in KINDS:
+        raise ValueError(f"sink: {', '.join(KINDS)}")
+    if int(spec.get("columns", 0)) not in range(4):
+        raise ValueError("columns: 0(자동) ~ 3")
+    if spec.get("color", "auto") not in COLORS:
+        raise ValueError(f"color: {', '.join(COLORS)}")
+    return {"tool": tool, "pdfs": [os.path.abspath(p) for p in pdfs],
+            "out": os.path.abspath(spec["out"]), "prefix": prefix, "fmt": fmt,
+            "gray": bool(spec.get("gray", False)),
+            "target_kb": int(spec.get("target_kb", TARGET_KB)), "sink": sink,
+            "color": spec.get("color", "auto"), "preview": bool(spec.get("preview", False)),
+            "columns": int(spec.get("columns", 0))}
+
+# ──────────────────────────────────────
+# 서비스
+
+def _warm(_):
+    """워커가 뜨면서 cut_questions(fitz 포함)를 import 하도록 하는 빈 작업"""
+    return os.getpid()
+
+def _alive(pool: ProcessPoolExecutor) -> bool:
+    """워커가 죽어 풀이 깨졌으면 False (빈 작업을 넣어만 보고 결과는 기다리지 않음)"""
+    try:
+        pool.submit(int)
+    except (BrokenProcessPool, RuntimeError):
+        return False
+    return True
+
+class Service:
+    def __init__(self, workers: int = None, max_queue: int = QUEUE_MAX):
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = self._start_pool()
+        self.ocr = None   # extract용 OcrPool — 첫 extract 작업 때 만든다
+        self.restarts = 0   # 깨진 풀을 다시 띄운 횟수
+        self.queue = queue.Queue(max_queue)
+        self.jobs = OrderedDict()
+        self.lock = threading.Lock()
+        self._seq = 0
+        self._runner = threading.Thread(target=self._run, daemon=True)
+        self._runner.start()
+
+    def _start_pool(self) -> ProcessPoolExecutor:
+        pool = ProcessPoolExecutor(self.workers)
+        list(pool.map(_warm, range(self.workers)))   # 첫 작업 전에 워커를 다 띄워 둠
+        return pool
+
+    def healthy(self) -> bool:
+        return _alive(self.pool) and (self.ocr is None or self.ocr.alive())
+
+    def _heal(self):
+        """워커가 죽어(메모리 부족 등) 깨진 풀을 새로 띄운다. 깨진 풀은 이후 작업도 모두 실패시킴"""
+        if not _alive(self.pool):
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = self._start_pool()
+            self.restarts += 1
+        if self.ocr is not None and not self.ocr.alive():
+            self.ocr.close()
+            self.ocr = None   # 다음 extract 작업 때 새로 만든다
+            self.restarts += 1
+
+    def submit(self, spec: dict, on_done=None) -> Job:
+        """대기열이 차 있으면 queue.Full"""
+        spec = parse_spec(spec)
+        with self.lock:
+            self._seq += 1
+            job = Job(f"{time.strftime('%Y%m%d-%H%M%S')}-{self._seq}", spec, on_done)
+            self.queue.put_nowait(job)
+            self.jobs[job.id] = job
+            self._trim()
+        return job
+
+    def get(self, job_id: str) -> Job:
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def list(self) -> list:
+        with self.lock:
+            return [job.to_dict() for job in self.jobs.values()]
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None:
+            return False
+        job.cancel.set()
+        return True
+
+    def _trim(self):
+        done = [j for j in self.jobs.values() if j.finished is not None]
+        for job in done[:max(0, len(done) - KEEP_DONE)]:
+            del self.jobs[job.id]
+
+    def _run(self):
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            if job.cancel.is_set():
+                job.state = "cancelled"
+            else:
+                job.state, job.started = "running", time.time()
+                try:
+                    self._heal()   # 쉬는 동안 죽은 워커도 작업 전에 복구
+                    if job.spec["tool"] == "cut":
+                        self._run_cut(job)
+                    else:
+                        self._run_extract(job)
+                    job.state = ("cancelled" if job.cancel.is_set() else
+                                 "failed" if job.error else "done")
+                except BrokenProcessPool as e:
+                    job.state, job.error = "failed", f"워커 프로세스 비정상 종료: {e}"
+                    job.lines.append(f"[ERR] {job.error}")
+                except Exception as e:
+                    job.state, job.error = "failed", f"{type(e).__name__}: {e}"
+                    job.lines.append(f"[ERR] {job.error}")
+                if job.state == "failed":   # extract는 풀이 깨져도 오류 이벤트로만 끝난다
+                    try:
+                        self._heal()
+                    except Exception as e:
+                        job.lines.append(f"[ERR] 워커 풀 재시작 실패: {type(e).__name__}: {e}")
+            job.finished = time.time()
+            if job.on_done is not None:
+                job.on_done(job)
+
+    def _targets(self, spec: dict) -> list:
+        jobs = []
+        for i, p in enumerate(spec["pdfs"]):
+            pre = spec["prefix"][i] if len(spec["prefix"]) > 1 else spec["prefix"][0]
+            jobs.append((p, pre, os.path.join(spec["out"], pre)))
+        return jobs
+
+    def _archive(self, spec: dict) -> str:
+        return os.path.join(spec["out"], time.strftime(f"questions-%Y%m%d-%H%M%S.{spec['sink']}"))
+
+    def _run_cut(self, job: Job):
+        spec = job.spec
+        jobs = self._targets(spec)
+        if spec["sink"] == "folder":
+            for _, _, tgt in jobs:
+                os.makedirs(tgt, exist_ok=True)
+        opts = Options(fmt=spec["fmt"], gray=spec["gray"], target_kb=spec["target_kb"],
+                       color=spec["color"], preview=spec["preview"])
+        with LayoutCache() as cache, BlobStore() as store, \
+                open_sink(spec["sink"], self._archive(spec), root=spec["out"]) as sink:
+            job.report = run_batch(jobs, opts, job, workers=self.workers, cache=cache,
+                                   sink=sink, store=store, executor=self.pool,
+                                   cancel=job.cancel)
+        job.lines.append(f"성능 리포트: {write_report(spec['out'], job.report)}")
+
+    def _run_extract(self, job: Job):
+        import extract_questions as eq   # pdf2image·OCR 쪽은 필요할 때만
+
+        if self.ocr is None:
+            self.ocr = eq.OcrPool(self.workers)
+        spec = job.spec
+        os.makedirs(spec["out"], exist_ok=True)
+        stats, pdfs = Stats(), {}
+        t0 = time.perf_counter()
+        with LayoutCache() as cache, \
+                open_sink(spec["sink"], self._archive(spec), root=spec["out"]) as sink:
+            for pdf, pre, _ in self._targets(spec):
+                if job.cancel.is_set():
+                    break
+                pdf_stats = Stats()
+                eq.process_pdf(pdf, pre, spec["out"], spec["fmt"], job, spec["gray"],
+                               spec["columns"], self.ocr, cache, pdf_stats, sink, job.cancel)
+                stats.merge(pdf_stats.to_dict())
+                pdfs[Path(pdf).name] = pdf_stats
+                job.perf = stats.summary(time.perf_counter() - t0)
+        job.report = build_report(stats, time.perf_counter() - t0, pdfs,
+                                  workers=self.ocr.workers, sink=spec["sink"],
+                                  cancelled=job.cancel.is_set(),
+                                  options={"dpi": eq.DPI, "fmt": spec["fmt"],
+                                           "gray": spec["gray"], "columns": spec["columns"]})
+        job.lines.append(f"성능 리포트: {write_report(spec['out'], job.report)}")
+
+    def close(self):
+        with self.lock:
+            for job in self.jobs.values():
+                job.cancel.set()
+        try:
+            self.queue.put_nowait(None)
+        except queue.Full:
+            pass
+        self.pool.shutdown(cancel_futures=True)
+        if self.ocr is not None:
+            self.ocr.close()
+
+# ──────────────────────────────────────
+# 받은 편지함 폴더
+
+class Inbox(threading.Thread):
+    """folder에 들어온 PDF를 작업으로 넣는다. 크기·수정 시각이 한 번 확인하는 동안
+    그대로여야(복사 완료) 처리하고, 대기열이 차 있으면 다음 확인 때 다시 시도한다.
+    """
+    def __init__(self, service: Service, folder: str, outbox: str, defaults: dict):
+        super().__init__(daemon=True)
+        self.service = service
+        self.folder = folder
+        self.outbox = outbox
+        self.defaults = defaults
+        for sub in ("processing", "done", "failed"):
+            os.makedirs(os.path.join(folder, sub), exist_ok=True)
+        self._seen = {}   # 파일명 → (크기, 수정 시각)
+
+    def run(self):
+        while True:
+            self.scan()
+            time.sleep(POLL_SEC)
+
+    def scan(self):
+        paths = sorted(Path(self.folder).glob("*.pdf"), key=lambda p: p.stat().st_mtime)
+        seen, self._seen = self._seen, {}
+        for path in paths:
+            st = path.stat()
+            sig = (st.st_size, st.st_mtime_ns)
+            if seen.get(path.name) != sig:
+                self._seen[path.name] = sig   # 아직 복사 중일 수 있음
+                continue
+            work = os.path.join(self.folder, "processing", path.name)
+            os.replace(path, work)
+            spec = {**self.defaults, "pdfs": [work], "out": self.outbox}
+            try:
+                self.service.submit(spec, on_done=self.finish)
+            except queue.Full:
+                os.replace(work, path)
+                self._seen[path.name] = sig
+                return
+            except ValueError as e:
+                print(f"[inbox] {path.name}: {e}", file=sys.stderr)
+                os.replace(work, os.path.join(self.folder, "failed", path.name))
+
+    def finish(self, job: Job):
+        sub = "done" if job.state == "done" else "failed"
+        for pdf in job.spec["pdfs"]:
+            try:
+                shutil.move(pdf, os.path.join(self.folder, sub, os.path.basename(pdf)))
+            except OSError:
+                pass
+        print(f"[inbox] {job.id} {job.state} {job.perf}", flush=True)
+
+# ──────────────────────────────────────
+# HTTP
+
+class Handler(BaseHTTPRequestHandler):
+    server_version = "cut-questions/1"
+
+    def _send(self, status: int, body: dict, headers: dict = None):
+        data = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _job_id(self) -> str:
+        parts = urlsplit(self.path).path.strip("/").split("/")
+        return parts[1] if len(parts) == 2 and parts[0] == "jobs" else None
+
+    def do_GET(self):
+        svc = self.server.service
+        url = urlsplit(self.path)
+        if url.path == "/health":
+            return self._send(200, {"ok": svc.healthy(), "workers": svc.workers,
+                                    "restarts": svc.restarts, "queued": svc.queue.qsize(),
+                                    "queue_max": svc.queue.maxsize})
+        if url.path.rstrip("/") == "/jobs":
+            return self._send(200, {"jobs": svc.list()})
+        job = svc.get(self._job_id() or "")
+        if job is None:
+            return self._send(404, {"error": "없는 작업"})
+        try:
+            since = int(parse_qs(url.query).get("since", ["0"])[0])
+            if since < 0:
+                raise ValueError
+        except ValueError:
+            return self._send(400, {"error": "since: 0 이상의 정수"})
+        return self._send(200, job.to_dict(since))
+
+    def _foreign(self) -> bool:
+        """브라우저가 다른 사이트에서 보낸 요청(Origin 헤더 있음)이면 403으로 답하고 True"""
+        if self.headers.get("Origin") is None:
+            return False
+        self._send(403, {"error": "브라우저 요청은 받지 않음"})
+        return True
+
+    def do_POST(self):
+        if urlsplit(self.path).path.rstrip("/") != "/jobs":
+            return self._send(404, {"error": "없는 경로"})
+        if self._foreign():
+            return
+        ctype = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+        if ctype != "application/json":
+            return self._send(415, {"error": "Content-Type: application/json 필요"})
+        try:
+            n = int(self.headers.get("Content-Length", 0))
+            job = self.server.service.submit(json.loads(self.rfile.read(n) or b"{}"))
+        except queue.Full:
+            return self._send(503, {"error": "대기열이 가득 참"}, {"Retry-After": "5"})
+        except (ValueError, TypeError) as e:   # JSON 오류 포함
+            return self._send(400, {"error": str(e)})
+        return self._send(202, job.to_dict())
+
+    def do_DELETE(self):
+        if self._foreign():
+            return
+        job_id = self._job_id()
+        if job_id is None or not self.server.service.cancel(job_id):
+            return self._send(404, {"error": "없는 작업"})
+        return self._send(202, {"id": job_id, "cancel": True})
+
+    def log_message(self, fmt, *args):
+        pass   # 요청마다 찍지 않음
+
+class Client:
+    """서비스 HTTP 클라이언트 (표준 라이브러리만 사용)"""
+    def __init__(self, url: str = None):
+        self.url = (url or f"http://127.0.0.1:{PORT}").rstrip("/")
+
+    def _call(self, method: str, path: str, body: dict = None, timeout: float = 5) -> tuple:
+        data = json.dumps(body).encode("utf-8") if body is not None else None
+        req = urllib.request.Request(self.url + path, data=data, method=method,
+                                     headers={"Content-Type": "application/json"})
+        try:
+            with urllib.request.urlopen(req, timeout=timeout) as resp:
+                return resp.status, json.loads(resp.read())
+        except urllib.error.HTTPError as e:
+            return e.code, json.loads(e.read() or b"{}")
+
+    def alive(self, timeout: float = 0.3) -> bool:
+        try:
+            return self._call("GET", "/health", timeout=timeout)[0] == 200
+        except OSError:
+            return False
+
+    def submit(self, spec: dict) -> dict:
+        status, body = self._call("POST", "/jobs", spec)
+        if status != 202:
+            raise RuntimeError(body.get("error", f"HTTP {status}"))
+        return body
+
+    def status(self, job_id: str, since: int = 0) -> dict:
+        return self._call("GET", f"/jobs/{job_id}?since={since}")[1]
+
+    def cancel(self, job_id: str) -> bool:
+        return self._call("DELETE", f"/jobs/{job_id}")[0] == 202
+
+def main(argv=None) -> int:
+    ap = argparse.ArgumentParser(prog="service", description="문항 자르기 상주 서비스")
+    ap.add_argument("--host", default="127.0.0.1", help="바인드 주소 (기본: 이 컴퓨터만)")
+    ap.add_argument("--port", type=int, default=PORT, help="HTTP 포트")
+    ap.add_argument("-j", "--jobs", type=int, default=os.cpu_count(), help="워커 프로세스 수")
+    ap.add_argument("--queue", type=int, default=QUEUE_MAX, help="대기 작업 수 상한")
+    ap.add_argument("--inbox", help="감시할 받은 편지함 폴더")
+    ap.add_argument("--outbox", help="받은 편지함 작업의 출력 폴더 (기본: 받은 편지함/out)")
+    ap.add_argument("--tool", choices=("cut", "extract"), default="cut",
+                    help="받은 편지함 작업 종류")
+    ap.add_argument("-f", "--fmt", choices=list(FORMATS), default="png",
+                    help="받은 편지함 작업 이미지 형식")
+    ap.add_argument("--gray", action="store_true", help="받은 편지함 작업을 흑백으로")
+    ap.add_argument("--sink", choices=KINDS, default="folder", help="받은 편지함 작업 출력 방식")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    service = Service(args.jobs, args.queue)
+    server = ThreadingHTTPServer((args.host, args.port), Handler)
+    server.daemon_threads = True
+    server.service = service
+    if args.inbox:
+        Inbox(service, args.inbox, args.outbox or os.path.join(args.inbox, "out"),
+              {"tool": args.tool, "fmt": args.fmt, "gray": args.gray, "sink": args.sink}).start()
+    print(f"서비스 시작 http://{args.host}:{args.port} (워커 {service.workers}개, "
+          f"{time.perf_counter() - t0:.1f}초)", flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.close()
+    return 0
+
+if __name__ == "__main__":
+    multiprocessing.freeze_support()
+    sys.exit(main())
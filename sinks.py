@@ -0,0 +1,189 @@
+# 파일명: sinks.py
+"""
+문항 이미지 출력 대상 (cut_questions / extract_questions 공용)
+- folder : 지금처럼 폴더마다 낱개 파일 (매니페스트로 이어 하기 가능)
+- zip    : 인코딩되는 대로 ZIP에 이어 붙임 (무압축 — 이미지는 이미 압축됨)
+- tar    : 스트리밍 tar (seek 없이 순서대로 씀 → 네트워크 드라이브·파이프에 유리)
+- pack   : 한 파일 + 끝에 오프셋 테이블 → 이름으로 바로 읽기 (PackReader)
+모두 메모리의 인코딩 결과를 그대로 쓰고, 임시 파일이나 다시 읽기는 없다.
+"""
+import io
+import os
+import json
+import time
+import struct
+import hashlib
+import tarfile
+import zipfile
+
+KINDS = ("folder", "zip", "tar", "pack")
+
+class FolderSink:
+    kind = "folder"
+    resumable = True   # 파일이 남아 있으므로 매니페스트로 건너뛸 수 있음
+
+    def write(self, folder: str, name: str, data: bytes) -> str:
+        path = os.path.join(folder, name)
+        try:
+            f = open(path, "xb")
+        except FileExistsError:
+            # 덮어쓰기 전에 지운다 — 중복 저장소와 하드 링크된 파일을 잘라 먹지 않도록
+            os.remove(path)
+            f = open(path, "xb")
+        with f:
+            f.write(data)
+        return path
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+class _ArchiveSink(FolderSink):
+    """root 기준 상대 경로(접두어 폴더/파일명)를 항목 이름으로 쓰는 단일 파일 출력"""
+    resumable = False
+
+    def __init__(self, path: str, root: str = None):
+        self.path = path
+        self.root = root if root is not None else os.path.dirname(os.path.abspath(path))
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+
+    def arcname(self, folder: str, name: str) -> str:
+        rel = os.path.relpath(os.path.join(folder, name), self.root)
+        return rel.replace(os.sep, "/")
+
+    def write(self, folder: str, name: str, data: bytes) -> str:
+        self._add(self.arcname(folder, name), data)
+        return self.path
+
+class ZipSink(_ArchiveSink):
+    kind = "zip"
+
+    def __init__(self, path: str, root: str = None):
+        super().__init__(path, root)
+        self._zf = zipfile.ZipFile(path, "w", zipfile.ZIP_STORED)
+
+    def _add(self, arcname: str, data: bytes) -> None:
+        info = zipfile.ZipInfo(arcname, time.localtime()[:6])
+        self._zf.writestr(info, data)
+
+    def close(self) -> None:
+        self._zf.close()   # 중앙 디렉터리는 마지막에 한 번
+
+class TarSink(_ArchiveSink):
+    kind = "tar"
+
+    def __init__(self, path: str, root: str = None):
+        super().__init__(path, root)
+        self._tf = tarfile.open(path, "w|")
+
+    def _add(self, arcname: str, data: bytes) -> None:
+        info = tarfile.TarInfo(arcname)
+        info.size = len(data)
+        info.mtime = int(time.time())
+        self._tf.addfile(info, io.BytesIO(data))
+
+    def close(self) -> None:
+        self._tf.close()
+
+# ──────────────────────────────────────
+# pack: MAGIC | (레코드 헤더 + 이름 + 데이터)* | 인덱스(JSON) | 트레일러
+#   레코드 헤더 <HI : 이름 길이, 데이터 길이  (인덱스가 없어도 앞에서부터 복구 가능)
+#   인덱스     {"files": [[이름, 데이터 오프셋, 길이], ...]}  — 같은 바이트는 한 번만 쓰고 가리킴
+#   트레일러   <QQ : 인덱스 오프셋, 인덱스 길이 + MAGIC
+PACK_MAGIC = b"QPACK\x00\x01\x00"
+_REC = struct.Struct("<HI")
+_TRAILER = struct.Struct("<QQ")
+
+class PackSink(_ArchiveSink):
+    kind = "pack"
+
+    def __init__(self, path: str, root: str = None):
+        super().__init__(path, root)
+        self._f = open(path, "wb")
+        self._f.write(PACK_MAGIC)
+        self._index = []
+        self._offsets = {}   # sha256 → 데이터 오프셋
+
+    def _add(self, arcname: str, data: bytes) -> None:
+        digest = hashlib.sha256(data).digest()
+        if digest in self._offsets:
+            self._index.append([arcname, self._offsets[digest], len(data)])
+            return
+        name = arcname.encode("utf-8")
+        self._f.write(_REC.pack(len(name), len(data)) + name)
+        self._offsets[digest] = self._f.tell()
+        self._index.append([arcname, self._f.tell(), len(data)])
+        self._f.write(data)
+
+    def close(self) -> None:
+        index = json.dumps({"files": self._index}, ensure_ascii=False).encode("utf-8")
+        offset = self._f.tell()
+        self._f.write(index)
+        self._f.write(_TRAILER.pack(offset, len(index)) + PACK_MAGIC)
+        self._f.close()
+
+class PackReader:
+    """pack 파일 읽기. 트레일러가 없으면(기록 도중 끊김) 레코드를 처음부터 훑어 복구."""
+    def __init__(self, path: str):
+        self._f = open(path, "rb")
+        if self._f.read(len(PACK_MAGIC)) != PACK_MAGIC:
+            self._f.close()
+            raise ValueError(f"pack 파일이 아님: {path}")
+        self.index = self._read_index()
+
+    def _read_index(self) -> dict:
+        tail = _TRAILER.size + len(PACK_MAGIC)
+        size = self._f.seek(0, os.SEEK_END)
+        if size >= len(PACK_MAGIC) + tail:
+            self._f.seek(size - tail)
+            offset, length = _TRAILER.unpack(self._f.read(_TRAILER.size))
+            if self._f.read(len(PACK_MAGIC)) == PACK_MAGIC:
+                self._f.seek(offset)
+                files = json.loads(self._f.read(length))["files"]
+                return {name: (off, n) for name, off, n in files}
+        return self._scan(size)
+
+    def _scan(self, size: int) -> dict:
+        index, pos = {}, len(PACK_MAGIC)
+        while pos + _REC.size <= size:
+            self._f.seek(pos)
+            name_len, n = _REC.unpack(self._f.read(_REC.size))
+            off = pos + _REC.size + name_len
+            if off + n > size:
+                break   # 마지막 레코드가 잘림
+            try:
+                index[self._f.read(name_len).decode("utf-8")] = (off, n)
+            except UnicodeDecodeError:
+                break   # 인덱스를 쓰다 끊긴 꼬리
+            pos = off + n
+        return index
+
+    def names(self) -> list:
+        return list(self.index)
+
+    def read(self, name: str) -> bytes:
+        off, n = self.index[name]
+        self._f.seek(off)
+        return self._f.read(n)
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+_ARCHIVES = {"zip": ZipSink, "tar": TarSink, "pack": PackSink}
+
+def open_sink(kind: str = "folder", path: str = None, root: str = None) -> FolderSink:
+    """kind: folder · zip · tar · pack. 묶음 파일이면 path에 쓰고, 항목 이름은 root 기준 경로."""
+    if kind == "folder":
+        return FolderSink()
+    return _ARCHIVES[kind](path, root)